@@ -8,20 +8,26 @@ class DeliveryProblem:
         self.orders = orders
         self.map_routes = map_routes
         self.expanded = 0
+        self.pruned = 0  # pushes pruned by an A* upper bound
+        self.dominated = 0  # pushes dropped by A* dominance pruning
 
     def get_start_state(self):
         return self.start_state
 
     def is_goal_state(self, state):
-        _, pickup, delivered = state
-        return all(delivered)
+        return all(state[2])
 
     def get_successors(self, state):
+        """
+        Returns the (state, move, distance) successors over the roads of the current location.
+        Orders are only handled when a point is entered: an order is picked up on arriving at its
+        source and delivered on arriving at its destination, so work left at the current point,
+        such as an order picked up at the start, takes a round trip.
+        """
         current_location, pickup, delivered = state
         successors = []
         self.expanded = self.expanded + 1
-        legal_moves = self.map_routes.get_legal_moves(current_location)
-        for move in legal_moves:
+        for move, distance in self.map_routes.get_neighbors(current_location):
             new_pickup = pickup.copy()
             new_delivered = delivered.copy()
             for index, order in enumerate(self.orders):
@@ -32,12 +38,58 @@ class DeliveryProblem:
                     new_delivered[index] = True
 
             successors.append(((move, new_pickup, new_delivered),
-                               (current_location, move),
-                               self.map_routes.get_distance(current_location,
-                                                            move)))
+                               (current_location, move), distance))
 
         return successors
 
+    def remaining_places(self, state):
+        """
+        Returns the current location and the places still to visit: the source of every order
+        not picked up yet and the destination of every order not delivered yet, in orders order.
+        """
+        current_location, pickup, delivered = state[0], state[1], state[2]
+        places = []
+        for index, order in enumerate(self.orders):
+            if not pickup[index]:
+                places.append(order.source)
+            if not delivered[index]:
+                places.append(order.destination)
+        return current_location, places
+
+    def pending_orders(self, state):
+        """
+        Returns the current location and a (order, picked up) pair for every order not delivered
+        yet, in orders order.
+        """
+        current_location, pickup, delivered = state[0], state[1], state[2]
+        return current_location, [(order, pickup[index])
+                                  for index, order in enumerate(self.orders)
+                                  if not delivered[index]]
+
+    def dominance_key(self, state):
+        """
+        Returns the (location, pickup mask, delivered mask) key that A* dominance pruning
+        compares states by, or None if the state must never be pruned. A state is dominated by
+        another at the same location that picked up and delivered supersets of its orders at no
+        higher cost: every pickup and delivery is monotone, so the other state can follow any
+        path of this one to a goal.
+        """
+        current_location, pickup, delivered = state[0], state[1], state[2]
+        pickup_mask = 0
+        delivered_mask = 0
+        for index in range(len(self.orders)):
+            if pickup[index]:
+                pickup_mask |= 1 << index
+            if delivered[index]:
+                delivered_mask |= 1 << index
+        return current_location, pickup_mask, delivered_mask
+
+    def expand_path(self, path):
+        """
+        Returns the path as a list of road moves between adjacent points.
+        """
+        return path
+
     def get_cost_of_actions(self, actions):
         total_cost = 0
         for i in range(len(actions)):
@@ -46,31 +98,292 @@ class DeliveryProblem:
         return total_cost
 
 class DeliveryCapacityProblem(DeliveryProblem):
+    """
+    A DeliveryProblem where at most deliveriesNum orders can be carried at once.
+    A state is a (location, [bool...], [bool...], load) tuple, where the load is the number of
+    orders carried, kept up to date on every pickup and delivery.
+    """
+
     def __init__(self, start_state, orders, map_routes, deliveriesNum):
+        """
+        Initializes the problem, adding the load to the start state if it is missing.
+        """
         super().__init__(start_state, orders,map_routes)
         self.deliveriesNum = deliveriesNum
+        if len(start_state) == 3:
+            location, pickup, delivered = start_state
+            self.start_state = (location, pickup, delivered,
+                                pickup.count(True) - delivered.count(True))
+        self.location_orders = dict()
+        # location -> [(order index, is source, is destination)] in orders order
+        for index, order in enumerate(orders):
+            for location in {order.source, order.destination}:
+                self.location_orders.setdefault(location, []).append(
+                    (index, location == order.source,
+                     location == order.destination))
 
     def get_successors(self, state):
-        current_location, pickup, delivered = state
+        current_location, pickup, delivered, load = state
         successors = []
         self.expanded = self.expanded + 1
-        legal_moves = self.map_routes.get_legal_moves(current_location)
-        for move in legal_moves:
-            new_pickup = pickup.copy()
-            new_delivered = delivered.copy()
-            for index, order in enumerate(self.orders):
-                cur_delivered = new_delivered.count(True)
-                cur_pickup = new_pickup.count(True)
-                c = cur_pickup - cur_delivered
-                if move == order.source and not new_pickup[index] and c < self.deliveriesNum:
+        for move, distance in self.map_routes.get_neighbors(current_location):
+            new_pickup = pickup
+            new_delivered = delivered
+            new_load = load
+            # the lists are copied on their first change, unchanged ones are shared
+            for index, is_source, is_destination in self.location_orders.get(
+                    move, ()):
+                if is_source and not new_pickup[index] and new_load < self.deliveriesNum:
+                    if new_pickup is pickup:
+                        new_pickup = pickup.copy()
                     new_pickup[index] = True
-                elif move == order.destination and new_pickup[index] and not \
+                    new_load += 1
+                elif is_destination and new_pickup[index] and not \
                         new_delivered[index]:
+                    if new_delivered is delivered:
+                        new_delivered = delivered.copy()
                     new_delivered[index] = True
+                    new_load -= 1
 
-            successors.append(((move, new_pickup, new_delivered),
-                               (current_location, move),
-                               self.map_routes.get_distance(current_location,
-                                                            move)))
+            successors.append(((move, new_pickup, new_delivered, new_load),
+                               (current_location, move), distance))
+
+        return successors
+
+    def dominance_key(self, state):
+        """
+        Pickups are forced while there is room, so a state carrying more orders can be blocked
+        from a pickup the other one makes: dominance is only used once the orders left to
+        deliver fit in the capacity, when it can't bind anymore.
+        """
+        if state[2].count(False) > self.deliveriesNum:
+            return None
+        return super().dominance_key(state)
+
+
+class BitmaskDeliveryProblem(DeliveryProblem):
+    """
+    A DeliveryProblem with a compact state encoding.
+    A state is a (location id, pickup mask, delivered mask) tuple of ints, where the location
+    id is interned by the MapRoutes and bit i of a mask is set once order i is picked up or
+    delivered. States are hashable as-is and are never copied.
+    """
+
+    def __init__(self, start_state, orders, map_routes):
+        """
+        Initializes the problem, encoding the start state if it is given as lists.
+        """
+        super().__init__(start_state, orders, map_routes)
+        self.goal_mask = (1 << len(orders)) - 1
+        self.source_masks = dict()  # location id -> mask of the orders picked up there
+        self.destination_masks = dict()  # location id -> mask of the orders delivered there
+        for index, order in enumerate(orders):
+            source = map_routes.location_id(order.source)
+            destination = map_routes.location_id(order.destination)
+            self.source_masks[source] = self.source_masks.get(source, 0) | (1 << index)
+            self.destination_masks[destination] = \
+                self.destination_masks.get(destination, 0) | (1 << index)
+        self.start_state = self.encode_state(start_state)
+        self.places = dict()  # (pickup mask, delivered mask) -> remaining places
+        self.pending = dict()  # (pickup mask, delivered mask) -> pending orders
+
+    def encode_state(self, state):
+        """
+        Returns the bitmask encoding of a (location, [bool...], [bool...]) state.
+        """
+        location, pickup, delivered = state[0], state[1], state[2]
+        if isinstance(location, int):
+            return state
+        pickup_mask = 0
+        delivered_mask = 0
+        for index in range(len(self.orders)):
+            if pickup[index]:
+                pickup_mask |= 1 << index
+            if delivered[index]:
+                delivered_mask |= 1 << index
+        return self.map_routes.location_id(location), pickup_mask, delivered_mask
+
+    def decode_state(self, state):
+        """
+        Returns the (location, [bool...], [bool...]) form of a bitmask state.
+        """
+        location, pickup, delivered = state[0], state[1], state[2]
+        return (self.map_routes.location_name(location),
+                [(pickup >> index) & 1 == 1 for index in range(len(self.orders))],
+                [(delivered >> index) & 1 == 1 for index in range(len(self.orders))])
+
+    def is_goal_state(self, state):
+        return state[2] == self.goal_mask
 
-        return successors
\ No newline at end of file
+    def get_successors(self, state):
+        current_location, pickup, delivered = state
+        successors = []
+        self.expanded = self.expanded + 1
+        current_name = self.map_routes.location_name(current_location)
+        for move_id, distance in self.map_routes.get_neighbor_ids(
+                current_location):
+            new_pickup = pickup | self.source_masks.get(move_id, 0)
+            new_delivered = delivered | (
+                self.destination_masks.get(move_id, 0) & pickup)
+            successors.append(((move_id, new_pickup, new_delivered),
+                               (current_name,
+                                self.map_routes.location_name(move_id)),
+                               distance))
+        return successors
+
+    def dominance_key(self, state):
+        return state[0], state[1], state[2]
+
+    def remaining_places(self, state):
+        location, pickup, delivered = state[0], state[1], state[2]
+        key = (pickup, delivered)
+        if key not in self.places:
+            places = []
+            for index, order in enumerate(self.orders):
+                if not (pickup >> index) & 1:
+                    places.append(order.source)
+                if not (delivered >> index) & 1:
+                    places.append(order.destination)
+            self.places[key] = places
+        return self.map_routes.location_name(location), self.places[key]
+
+    def pending_orders(self, state):
+        location, pickup, delivered = state[0], state[1], state[2]
+        key = (pickup, delivered)
+        if key not in self.pending:
+            self.pending[key] = [(order, (pickup >> index) & 1 == 1)
+                                 for index, order in enumerate(self.orders)
+                                 if not (delivered >> index) & 1]
+        return self.map_routes.location_name(location), self.pending[key]
+
+
+class BitmaskDeliveryCapacityProblem(BitmaskDeliveryProblem):
+    """
+    A BitmaskDeliveryProblem where at most deliveriesNum orders can be carried at once.
+    A state is a (location id, pickup mask, delivered mask, load) tuple of ints.
+    """
+
+    def __init__(self, start_state, orders, map_routes, deliveriesNum):
+        super().__init__(start_state, orders, map_routes)
+        self.deliveriesNum = deliveriesNum
+        location, pickup, delivered = self.start_state[:3]
+        self.start_state = (location, pickup, delivered,
+                            bin(pickup).count("1") - bin(delivered).count("1"))
+        self.location_orders = dict()
+        # location id -> [(order bit, is source, is destination)] in orders order
+        for index, order in enumerate(orders):
+            for location in {order.source, order.destination}:
+                self.location_orders.setdefault(
+                    map_routes.location_id(location), []).append(
+                    (1 << index, location == order.source,
+                     location == order.destination))
+
+    def get_successors(self, state):
+        current_location, pickup, delivered, load = state
+        successors = []
+        self.expanded = self.expanded + 1
+        current_name = self.map_routes.location_name(current_location)
+        for move_id, distance in self.map_routes.get_neighbor_ids(
+                current_location):
+            new_pickup = pickup
+            new_delivered = delivered
+            c = load
+            for bit, is_source, is_destination in self.location_orders.get(
+                    move_id, ()):
+                if is_source and not new_pickup & bit and c < self.deliveriesNum:
+                    new_pickup |= bit
+                    c += 1
+                elif is_destination and new_pickup & bit and not \
+                        new_delivered & bit:
+                    new_delivered |= bit
+                    c -= 1
+
+            successors.append(((move_id, new_pickup, new_delivered, c),
+                               (current_name,
+                                self.map_routes.location_name(move_id)),
+                               distance))
+
+        return successors
+
+    def dominance_key(self, state):
+        """
+        Used only once the capacity can't bind anymore, see DeliveryCapacityProblem.
+        """
+        if len(self.orders) - bin(state[2]).count("1") > self.deliveriesNum:
+            return None
+        return super().dominance_key(state)
+
+
+class KeyLocationDeliveryProblem(BitmaskDeliveryProblem):
+    """
+    A BitmaskDeliveryProblem whose moves jump straight between key locations, the sources and
+    destinations of the orders, at the cost of the shortest road path between them.
+    Only key locations where an order can still be picked up or delivered are successors, since
+    passing through any other point changes nothing; expand_path() turns a solution back into
+    road moves. Staying at a key location that still has work is a round trip over its
+    cheapest road.
+    """
+
+    def __init__(self, start_state, orders, map_routes):
+        super().__init__(start_state, orders, map_routes)
+        if map_routes.road_distances is None:
+            map_routes.compute_shortest_paths()
+        self.key_locations = []
+        for order in orders:
+            for location in (order.source, order.destination):
+                location_id = map_routes.location_id(location)
+                if location_id not in self.key_locations:
+                    self.key_locations.append(location_id)
+
+    def get_successors(self, state):
+        current_location, pickup, delivered = state
+        successors = []
+        self.expanded = self.expanded + 1
+        current_name = self.map_routes.location_name(current_location)
+        for move_id in self.key_locations:
+            new_pickup = pickup | self.source_masks.get(move_id, 0)
+            new_delivered = delivered | (
+                self.destination_masks.get(move_id, 0) & pickup)
+            if new_pickup == pickup and new_delivered == delivered:
+                continue
+            if move_id == current_location:
+                distance = self.round_trip(current_name)[1]
+                if distance == float('inf'):
+                    continue
+            else:
+                distance = self.map_routes.road_distances.item(
+                    current_location, move_id)
+            successors.append(((move_id, new_pickup, new_delivered),
+                               (current_name,
+                                self.map_routes.location_name(move_id)),
+                               distance))
+        return successors
+
+    def round_trip(self, location):
+        """
+        Returns the cheapest neighbour of a location and the cost of driving there and back.
+        """
+        neighbour, distance = min(self.map_routes.get_neighbors(location),
+                                  key=lambda item: (item[1], item[0]),
+                                  default=(None, float('inf')))
+        return neighbour, 2 * distance
+
+    def expand_path(self, path):
+        road_path = []
+        for p1, p2 in path:
+            if p1 == p2:
+                neighbour = self.round_trip(p1)[0]
+                road_path.extend([(p1, neighbour), (neighbour, p1)])
+                continue
+            points = self.map_routes.road_path(p1, p2)
+            road_path.extend(zip(points, points[1:]))
+        return road_path
+
+    def get_cost_of_actions(self, actions):
+        total_cost = 0
+        for p1, p2 in actions:
+            if p1 == p2:
+                total_cost += self.round_trip(p1)[1]
+                continue
+            total_cost += self.map_routes.road_distance(p1, p2)
+        return total_cost
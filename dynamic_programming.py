@@ -0,0 +1,116 @@
+import numpy as np
+
+MAX_ORDERS = 12
+
+
+class PickupDeliveryDP:
+    """
+    An exact Held-Karp style dynamic programming solver for the uncapacitated delivery problem.
+    The table is indexed by (order statuses, current key location), where the statuses of the
+    orders (0 waiting, 1 picked up, 2 delivered) are packed into one base-3 number. This is the
+    visited mask over the pickup and delivery stops restricted to the masks that respect
+    pickup-before-delivery precedence. The table has 3^orders * key locations cells, so run time
+    and memory depend only on the number of orders.
+    """
+
+    @staticmethod
+    def solve(problem):
+        """
+        Returns an optimal path of road moves for the orders of the problem, starting at the
+        start location with no order picked up, and its cost.
+        """
+        map_routes = problem.map_routes
+        if map_routes.road_distances is None:
+            map_routes.compute_shortest_paths()
+        start, _ = problem.remaining_places(problem.get_start_state())
+        orders = problem.orders
+        n = len(orders)
+
+        # key location 0 is the start; the start point may appear again as an order location
+        key_locations = [start]
+        stops = []  # order index -> (key location of the source, key location of the destination)
+        for order in orders:
+            stop = []
+            for location in (order.source, order.destination):
+                if location not in key_locations[1:]:
+                    key_locations.append(location)
+                stop.append(key_locations.index(location, 1))
+            stops.append(stop)
+        distances = PickupDeliveryDP.key_distances(map_routes, key_locations)
+
+        powers = 3 ** np.arange(n)
+        states = np.arange(3 ** n)
+        digits = ((states[:, None] // powers) % 3).astype(np.int8)
+        layers = digits.sum(axis=1)
+        table = np.full((3 ** n, len(key_locations)), np.inf)
+        table[0, 0] = 0
+        for layer in range(1, 2 * n + 1):
+            layer_states = states[layers == layer]
+            layer_digits = digits[layer_states]
+            for index in range(n):
+                for status in (1, 2):
+                    targets = layer_states[layer_digits[:, index] == status]
+                    if len(targets) == 0:
+                        continue
+                    location = stops[index][status - 1]
+                    sources = targets - powers[index]
+                    best = (table[sources] + distances[:, location]).min(axis=1)
+                    table[targets, location] = np.minimum(
+                        table[targets, location], best)
+
+        location = int(np.argmin(table[-1]))
+        cost = table[-1, location]
+        if cost == np.inf:
+            return None, float('inf')
+        return PickupDeliveryDP.extract_path(
+            table, digits, stops, distances, key_locations, map_routes,
+            location), float(cost)
+
+    @staticmethod
+    def key_distances(map_routes, key_locations):
+        """
+        Returns the matrix of shortest road distances between the key locations, where the start
+        back to itself is the cheapest round trip over one of its roads.
+        """
+        ids = [map_routes.location_ids[location] for location in key_locations]
+        distances = map_routes.road_distances[np.ix_(ids, ids)].copy()
+        round_trip = 2 * min([dist for _, dist in
+                              map_routes.get_neighbors(key_locations[0])],
+                             default=np.inf)
+        for j in range(1, len(key_locations)):
+            if key_locations[j] == key_locations[0]:
+                distances[0, j] = round_trip
+        return distances
+
+    @staticmethod
+    def extract_path(table, digits, stops, distances, key_locations,
+                     map_routes, location):
+        """
+        Walks the table back from the final state and returns the road moves of the solution.
+        """
+        state = len(table) - 1
+        jumps = []
+        while state != 0:
+            for index, status in enumerate(digits[state]):
+                if status == 0 or stops[index][status - 1] != location:
+                    continue
+                source = state - 3 ** index
+                through = table[source] + distances[:, location]
+                previous = int(np.argmin(through))
+                if np.isclose(through[previous], table[state, location]):
+                    break
+            if previous != location:
+                jumps.append((key_locations[previous], key_locations[location]))
+            state, location = source, previous
+        jumps.reverse()
+        path = []
+        for p1, p2 in jumps:
+            if p1 == p2:
+                # a round trip from the start back to itself
+                neighbor = min(map_routes.get_neighbors(p1),
+                               key=lambda neighbor: neighbor[1])[0]
+                path.extend([(p1, neighbor), (neighbor, p1)])
+                continue
+            points = map_routes.road_path(p1, p2)
+            path.extend(zip(points, points[1:]))
+        return path
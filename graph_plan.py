@@ -0,0 +1,177 @@
+import numpy as np
+
+from plan_graph_level import PlanGraphLevel
+from planning_problem import is_fixed
+from proposition import Proposition
+
+
+class GraphPlan(object):
+    """
+    A GraphPlan solver for a PlanningProblem: it expands the planning graph with its mutexes until
+    the goal propositions appear pairwise non mutex, then searches backward for a plan, memoizing the
+    goal sets that failed at every level (the nogoods).
+    The plan is a list of steps, each a list of non mutex actions that can be applied in any order.
+    """
+
+    def __init__(self, planning_problem):
+        """
+        Constructor
+        """
+        self.planning_problem = planning_problem
+        self.graph = []  # the levels of the planning graph
+        self.no_goods = []  # level -> the set of the goal sets that failed at the level
+        self.level_indices = []  # level -> the LevelIndex of the level, once searched
+        PlanGraphLevel.set_actions(planning_problem.actions)
+        PlanGraphLevel.set_props(planning_problem.propositions)
+
+    def graph_plan(self):
+        """
+        Returns a plan as a list of steps of actions, or None if there is no plan.
+        The search fails once the graph is fixed and the nogoods of the last level stop growing.
+        """
+        self.planning_problem.expanded = 0
+        level = PlanGraphLevel()
+        for prop in self.planning_problem.state_propositions(
+                self.planning_problem.get_start_state()):
+            level.get_proposition_layer().add_proposition(Proposition(prop.name))
+        self.graph = [level]
+        self.no_goods = [set()]
+        self.level_indices = []
+        goal = frozenset(self.planning_problem.goal)
+        while not self.goals_non_mutex(goal, len(self.graph) - 1):
+            if is_fixed(self.graph, len(self.graph) - 1):
+                return None  # the goal is never reached non mutex
+            self.expand()
+        fixed_level = None  # the first level of the fixed graph
+        fixed_no_goods = None  # the number of nogoods of the fixed level after the last search
+        while True:
+            last = len(self.graph) - 1
+            plan = self.extract(self.goal_bitset(goal, last), last)
+            if plan is not None:
+                return plan
+            if fixed_level is None and is_fixed(self.graph, last):
+                fixed_level = last
+            if fixed_level is not None:
+                if fixed_no_goods == len(self.no_goods[fixed_level]):
+                    return None
+                fixed_no_goods = len(self.no_goods[fixed_level])
+            self.expand()
+
+    def expand(self):
+        """
+        Adds a level to the planning graph.
+        """
+        level = PlanGraphLevel()
+        level.expand(self.graph[-1])
+        self.graph.append(level)
+        self.no_goods.append(set())
+
+    def goals_non_mutex(self, goal, level):
+        """
+        Returns true if all the goal propositions are in the proposition layer of the level, and
+        they are pairwise non mutex.
+        """
+        prop_layer = self.graph[level].get_proposition_layer()
+        if not goal <= prop_layer.get_propositions():
+            return False
+        goal = list(goal)
+        for i in range(len(goal)):
+            for j in range(i + 1, len(goal)):
+                if prop_layer.is_mutex(goal[i], goal[j]):
+                    return False
+        return True
+
+    def extract(self, goal, level):
+        """
+        Searches backward for the steps achieving a goal set at a level, or returns None.
+        The goal set is a bitset over the positions of the propositions in the layer of the level.
+        """
+        if level == 0:
+            return []
+        if goal in self.no_goods[level]:
+            return None
+        self.planning_problem.expanded += 1
+        plan = self.gp_search(self.level_index(level), goal, 0, 0, 0, level)
+        if plan is None:
+            self.no_goods[level].add(goal)
+        return plan
+
+    def gp_search(self, index, goal, step, achieved, preconditions, level):
+        """
+        Assigns a non mutex producer to every sub goal of the level not achieved yet by the step,
+        preferring noOps, and continues the backward search from the preconditions of the step.
+        The step, the achieved sub goals and the preconditions are bitsets over the positions of the
+        actions of the level, and of the propositions of the level and of the previous level.
+        """
+        remaining = goal & ~achieved
+        if not remaining:
+            plan = self.extract(preconditions, level - 1)
+            if plan is None:
+                return None
+            return plan + [[action for position, action in enumerate(index.actions)
+                            if step >> position & 1 and not action.is_noop()]]
+        sub_goal = (remaining & -remaining).bit_length() - 1
+        for position in index.producers[sub_goal]:
+            if index.mutexes[position] & step:
+                continue
+            plan = self.gp_search(index, goal, step | 1 << position,
+                                  achieved | index.adds[position],
+                                  preconditions | index.pres[position], level)
+            if plan is not None:
+                return plan
+        return None
+
+    def level_index(self, level):
+        """
+        Returns the LevelIndex of a level, creating it when first needed.
+        """
+        while len(self.level_indices) <= level:
+            self.level_indices.append(None)
+        if self.level_indices[level] is None:
+            self.level_indices[level] = LevelIndex(self.graph[level - 1], self.graph[level])
+        return self.level_indices[level]
+
+    def goal_bitset(self, goal, level):
+        """
+        Returns the bitset of a set of propositions over the positions of the layer of the level.
+        """
+        return bitset_of(goal, self.graph[level].get_proposition_layer().mutexPropositions.positions)
+
+
+class LevelIndex(object):
+    """
+    The bitsets the backward search uses at a level: for each action of the level, the positions of
+    its mutex actions, of its add effects in the level and of its preconditions in the previous level,
+    and for each proposition of the level, the positions of its producers, noOps first.
+    """
+
+    def __init__(self, previous_level, level):
+        """
+        Constructor
+        """
+        action_layer = level.get_action_layer()
+        prop_layer = level.get_proposition_layer()
+        prop_positions = prop_layer.mutexPropositions.positions
+        previous_positions = previous_level.get_proposition_layer().mutexPropositions.positions
+        self.actions = action_layer.get_action_list()
+        action_positions = action_layer.mutexActions.positions
+        mutex_matrix = action_layer.get_mutex_matrix()
+        self.mutexes = [sum(1 << int(other) for other in np.flatnonzero(row))
+                        for row in mutex_matrix]
+        self.adds = [bitset_of(action.get_add(), prop_positions)
+                     for action in self.actions]
+        self.pres = [bitset_of(action.get_pre(), previous_positions)
+                     for action in self.actions]
+        self.producers = [sorted((action_positions[action] for action in prop.get_producers()),
+                                 key=lambda position: not self.actions[position].is_noop())
+                          for prop in prop_layer.get_proposition_list()]
+
+
+def bitset_of(propositions, positions):
+    """
+    Returns the bitset of a collection of propositions over the positions of a layer.
+    """
+    bitset = 0
+    for prop in propositions:
+        bitset |= 1 << positions[prop]
+    return bitset
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+
+def delivery_state_key(state, problem):
+    """
+    Keys a delivery state by its current location and the (source, destination, picked up)
+    orders still pending, which is all the delivery heuristics look at: the places still to
+    visit follow from them, and the order based heuristics also pair each source with its
+    destination. Problems over the same map with overlapping orders, such as the order prefixes,
+    share keys.
+    """
+    location, pending = problem.pending_orders(state)
+    return location, tuple((order.source, order.destination, picked)
+                           for order, picked in pending)
+
+
+def planning_state_key(state, problem):
+    """
+    Keys a planning state by its propositions and the goal of the problem. The bitset is decoded
+    since each problem numbers its propositions on its own.
+    """
+    return frozenset(problem.state_propositions(state)), problem.goal
+
+
+class HeuristicCache:
+    """
+    Wraps a heuristic with a cache of its values, bounded to max_size entries with least recently
+    used eviction, and counts its hits and misses.
+    An instance can be passed anywhere a heuristic is expected and shared by all the problems
+    over the same map, so values computed for one problem are reused by the others.
+    """
+
+    def __init__(self, heuristic, max_size=100000, key=delivery_state_key):
+        """
+        Constructor
+        """
+        self.heuristic = heuristic
+        self.max_size = max_size
+        self.key = key  # (state, problem) -> hashable key of the heuristic value
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, state, problem):
+        """
+        Returns the heuristic value of the state, computing it only on a cache miss.
+        """
+        key = self.key(state, problem)
+        if key in self.values:
+            self.hits += 1
+            self.values.move_to_end(key)
+            return self.values[key]
+        self.misses += 1
+        value = self.heuristic(state, problem)
+        self.values[key] = value
+        if len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+        return value
+
+    def __len__(self):
+        return len(self.values)
+
+    def clear(self):
+        """
+        Empties the cache and resets the hit and miss counters.
+        """
+        self.values.clear()
+        self.hits = 0
+        self.misses = 0
@@ -1,4 +1,8 @@
-import networkx as nx
+import weakref
+
+import numpy as np
+
+mst_weights = weakref.WeakKeyDictionary()  # map routes -> {remaining places: MST weight}
 
 
 def maxPointAirDistHeuristic(state, problem):
@@ -6,20 +10,47 @@ def maxPointAirDistHeuristic(state, problem):
     Heuristic function that computes the maximum straight-line (air) distance from the current location
     to any unvisited source or destination.
     """
-    current_location = state[0]
-    remaining_sources, remaining_destinations = state[1], state[2]
+    current_location, remaining_places = problem.remaining_places(state)
     max_distance = 0
-    for index, order in enumerate(problem.orders):
-        # Check if the source has not been visited
-        if not remaining_sources[index]:
-            source_dist = problem.map_routes.air_distance(order.source,
-                                                          current_location)
-            max_distance = max(max_distance, source_dist)
-        # Check if the destination has not been visited
-        if not remaining_destinations[index]:
-            destination_dist = problem.map_routes.air_distance(
-                order.destination, current_location)
-            max_distance = max(max_distance, destination_dist)
+    for place in remaining_places:
+        max_distance = max(max_distance,
+                           problem.map_routes.air_distance(place,
+                                                           current_location))
+    return max_distance
+
+
+def maxPointRoadDistHeuristic(state, problem):
+    """
+    Heuristic function that computes the maximum shortest road distance from the current location
+    to any unvisited source or destination.
+    """
+    current_location, remaining_places = problem.remaining_places(state)
+    max_distance = 0
+    for place in remaining_places:
+        max_distance = max(max_distance,
+                           problem.map_routes.road_distance(current_location,
+                                                            place))
+    return max_distance
+
+
+def maxOrderRoadDistHeuristic(state, problem):
+    """
+    Heuristic function that computes, over the orders not delivered yet, the maximum shortest road
+    distance needed to complete one of them alone: from the current location through its source to
+    its destination, or straight to its destination once it is picked up.
+    """
+    current_location, pending_orders = problem.pending_orders(state)
+    max_distance = 0
+    for order, picked_up in pending_orders:
+        if picked_up:
+            distance = problem.map_routes.road_distance(current_location,
+                                                        order.destination)
+        else:
+            distance = problem.map_routes.road_distance(
+                current_location, order.source) + \
+                       problem.map_routes.road_distance(order.source,
+                                                        order.destination)
+        max_distance = max(max_distance, distance)
     return max_distance
 
 
@@ -28,16 +59,9 @@ def sumAirDistHeuristic(state, problem):
     Heuristic function that computes the sum of the minimum distances required to visit all unvisited
     sources and destinations starting from the current location.
     """
-    places = (state[1], state[2])
-    orders = problem.orders
-    remaining_places = []
-    for index, order in enumerate(orders):
-        if not places[0][index] and order.source != state[0]:
-            remaining_places.append(order.source)
-        if not places[1][index] and order.destination != state[0]:
-            remaining_places.append(order.destination)
-
-    cur_location = state[0]
+    cur_location, places = problem.remaining_places(state)
+    remaining_places = [place for place in places if place != cur_location]
+
     cur_min = cur_location
     path_length = 0
     while len(remaining_places) != 0:
@@ -57,27 +81,50 @@ def mstAirDistHeuristic(state, problem):
     """
     Heuristic function that computes the weight of the Minimum Spanning Tree (MST) for the remaining
     unvisited sources and destinations using air distances.
+    The weights are memoized per map by the set of remaining places, which many states share.
      """
-    places = (state[1], state[2])
-    orders = problem.orders
-    remaining_places = []
-
-    for index, order in enumerate(orders):
-        if not places[0][index]:
-            remaining_places.append(order.source)
-        if not places[1][index]:
-            remaining_places.append(order.destination)
+    _, remaining_places = problem.remaining_places(state)
 
     if len(remaining_places) <= 1:
         return 0
 
-    graph = nx.Graph()
+    places = frozenset(remaining_places)
+    weights = mst_weights.setdefault(problem.map_routes, dict())
+    if places not in weights:
+        weights[places] = mst_weight(problem.map_routes,
+                                     list(dict.fromkeys(remaining_places)))
+    return weights[places]
+
+
+def mst_weight(map_routes, places):
+    """
+    Computes the weight of the MST of distinct places with Prim's algorithm over a slice of the
+    dense air distances matrix.
+    The edge weights are summed per node, as networkx's Graph.size does, so the weight matches
+    nx.minimum_spanning_tree bit for bit whenever the MST is unique.
+    """
+    matrix, air_index = map_routes.air_distance_matrix()
+    indices = [air_index[place] for place in places]
+    distances = matrix[np.ix_(indices, indices)]
+    in_tree = np.zeros(len(places), dtype=bool)
+    in_tree[0] = True
+    best = distances[0].copy()
+    closest = np.zeros(len(places), dtype=int)
+    node_weights = [[] for _ in places]
+    for _ in range(len(places) - 1):
+        best[in_tree] = np.inf
+        node = int(np.argmin(best))
+        weight = best.item(node)
+        in_tree[node] = True
+        node_weights[node].append(weight)
+        node_weights[closest[node]].append(weight)
+        closer = distances[node] < best
+        closest[closer] = node
+        best[closer] = distances[node][closer]
+    return sum(sum(sorted(weights)) for weights in node_weights) / 2
 
-    for i in range(len(remaining_places)):
-        for j in range(i + 1, len(remaining_places)):
-            p1, p2 = remaining_places[i], remaining_places[j]
-            weight = problem.map_routes.air_distance(p1, p2)
-            graph.add_edge(p1, p2, weight=weight)
 
-    mst = nx.minimum_spanning_tree(graph)
-    return mst.size(weight='weight')
+# heuristic name (as given on the command line) -> heuristic function
+HEURISTICS = {'max': maxPointAirDistHeuristic, 'sum': sumAirDistHeuristic,
+              'mst': mstAirDistHeuristic, 'road': maxPointRoadDistHeuristic,
+              'order_road': maxOrderRoadDistHeuristic}
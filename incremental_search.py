@@ -0,0 +1,180 @@
+from delivery_problem import DeliveryCapacityProblem, BitmaskDeliveryProblem, \
+    BitmaskDeliveryCapacityProblem
+from heuristic_cache import HeuristicCache
+from heuristics import maxPointAirDistHeuristic
+from search import AStarSearch, UPPER_BOUND_TOLERANCE, hashable_state
+
+
+def follow_action(problem, state, action):
+    """
+    Returns the successor of a state by an action with the cost of the step, or None if the action
+    doesn't apply.
+    """
+    for successor, successor_action, step_cost in problem.get_successors(state):
+        if successor_action == action:
+            return successor, step_cost
+    return None
+
+
+def replay_path(problem, path):
+    """
+    Follows the moves of a path from the start state of a problem, stopping once a goal state is
+    reached. Returns the reached state, the followed part of the path and its cost, or None if a
+    move isn't a successor. problem.expanded is left unchanged.
+    """
+    expanded = problem.expanded
+    state = problem.get_start_state()
+    followed = []
+    cost = 0
+    for action in path:
+        if problem.is_goal_state(state):
+            break
+        step = follow_action(problem, state, action)
+        if step is None:
+            problem.expanded = expanded
+            return None
+        state, step_cost = step
+        followed.append(action)
+        cost += step_cost
+    problem.expanded = expanded
+    return state, followed, cost
+
+
+def complete_path(problem, path=()):
+    """
+    Replays a path from the start state of a problem, then extends it to a goal state by moving
+    along shortest road paths to the nearest feasible stop, a place where a pending order is
+    delivered or, below the capacity of the problem, picked up; a stop at the current place is
+    a round trip over its cheapest road. Returns the complete path and its cost, an upper bound
+    of the optimal cost, or None if the path can't be replayed or completed. problem.expanded is
+    left unchanged.
+    """
+    replay = replay_path(problem, path)
+    if replay is None:
+        return None
+    state, followed, cost = replay
+    expanded = problem.expanded
+    map_routes = problem.map_routes
+    capacity = getattr(problem, 'deliveriesNum', len(problem.orders))
+    while not problem.is_goal_state(state):
+        location, pending = problem.pending_orders(state)
+        load = sum(1 for _, picked in pending if picked)
+        targets = {order.destination if picked else order.source
+                   for order, picked in pending if picked or load < capacity}
+        target = min(targets, key=lambda place: (
+            map_routes.road_distance(location, place), place))
+        if target == location:
+            neighbour = min(map_routes.get_neighbors(location),
+                            key=lambda item: (item[1], item[0]),
+                            default=(None, 0))[0]
+            road = None if neighbour is None else [location, neighbour, location]
+        else:
+            road = map_routes.road_path(location, target)
+        if road is None or len(road) < 2:
+            problem.expanded = expanded
+            return None
+        for move in zip(road, road[1:]):
+            step = follow_action(problem, state, move)
+            if step is None:
+                problem.expanded = expanded
+                return None
+            state, step_cost = step
+            followed.append(move)
+            cost += step_cost
+            if problem.is_goal_state(state):
+                break
+        if problem.pending_orders(state)[1] == pending:  # no progress
+            problem.expanded = expanded
+            return None
+    problem.expanded = expanded
+    return followed, cost
+
+
+def capacity_sweep(problem, capacities, heuristic=maxPointAirDistHeuristic):
+    """
+    Solves a delivery problem for every capacity of a list with A*, and returns a list of
+    (path, cost, expanded nodes) results in the order of the capacities.
+    The work is shared across the capacities:
+    - the problem is first solved without a capacity, which is optimal for every capacity of at
+      least the number of orders and a lower bound for the others, since the forced pickups of a
+      capacity path only happen earlier without it;
+    - the unconstrained path and the previous capacity's path are replayed under each capacity,
+      and the cheapest one reaching the goal is an upper bound pruning the search, or the optimum
+      itself when it meets the lower bound;
+    - the g costs of the unconstrained search are shared: a state reached at g without a capacity
+      lies on no path cheaper than g plus its cost to the goal, so the unconstrained optimum
+      minus g bounds the cost to the goal of the same state under any capacity from below, and
+      prunes the capacity searches against their upper bound. The bound isn't consistent, so it
+      never orders the open list, and the closed sets themselves aren't shared since the
+      successors of a state depend on the capacity;
+    - all the searches share one cache of heuristic values, which don't depend on the capacity.
+    """
+    if not isinstance(heuristic, HeuristicCache):
+        heuristic = HeuristicCache(heuristic)
+    capacity_class = DeliveryCapacityProblem
+    if isinstance(problem, BitmaskDeliveryProblem):
+        capacity_class = BitmaskDeliveryCapacityProblem
+    problem.expanded = 0
+    g_costs = dict()
+    best_path, lower_bound = AStarSearch.a_star(problem, heuristic,
+                                                g_costs=g_costs)
+    unconstrained = (best_path, lower_bound, problem.expanded)
+
+    def prune_bound(state):
+        g_cost = g_costs.get(hashable_state(state[:3]))
+        return 0 if g_cost is None else lower_bound - g_cost
+
+    results = []
+    previous_path = None
+    for capacity in capacities:
+        if capacity >= len(problem.orders):
+            results.append(unconstrained)
+            previous_path = best_path
+            continue
+        capacity_problem = capacity_class(problem.start_state, problem.orders,
+                                          problem.map_routes, capacity)
+        bound_path, upper_bound = None, float('inf')
+        for path in (best_path, previous_path):
+            replay = replay_path(capacity_problem, path) if path else None
+            if replay is not None and capacity_problem.is_goal_state(replay[0]) \
+                    and replay[2] < upper_bound:
+                bound_path, upper_bound = replay[1], replay[2]
+        if upper_bound - lower_bound <= UPPER_BOUND_TOLERANCE:
+            results.append((bound_path, upper_bound, 0))
+        else:
+            path, cost = AStarSearch.a_star(capacity_problem, heuristic,
+                                            upper_bound, prune_bound=prune_bound)
+            if path is None:  # nothing beats the bound within the tolerance
+                path, cost = bound_path, upper_bound
+            results.append((path, cost, capacity_problem.expanded))
+        previous_path = results[-1][0]
+    return results
+
+
+def prefix_sweep(problems, heuristic=maxPointAirDistHeuristic):
+    """
+    Solves a list of problems over growing prefixes of one order list with A*, in order, and
+    yields a (path, cost, expanded nodes) result per prefix as soon as it is solved.
+    The work is shared across the prefixes:
+    - the path of a prefix, replayed on the next one and completed along shortest road paths, is
+      an upper bound pruning its search;
+    - the cost of a prefix is a lower bound for the next one, since a path delivering more orders
+      also delivers the prefix, so an upper bound meeting it is the optimum without a search;
+    - all the searches share one cache of heuristic values.
+    """
+    if not isinstance(heuristic, HeuristicCache):
+        heuristic = HeuristicCache(heuristic)
+    previous_path, lower_bound = (), 0
+    for problem in problems:
+        problem.expanded = 0
+        completed = complete_path(problem, previous_path)
+        if completed is not None and \
+                completed[1] - lower_bound <= UPPER_BOUND_TOLERANCE:
+            path, cost = completed
+        else:
+            upper_bound = float('inf') if completed is None else completed[1]
+            path, cost = AStarSearch.a_star(problem, heuristic, upper_bound)
+            if path is None and completed is not None:
+                path, cost = completed  # nothing beats the bound within the tolerance
+        yield path, cost, problem.expanded
+        previous_path, lower_bound = path or (), cost
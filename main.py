@@ -1,15 +1,25 @@
 import csv
+import functools
+import hashlib
+import os
 import time
 from CONSTANTS import *
 from matplotlib import pyplot as plt
 import matplotlib.image as mpimg
-from delivery_problem import DeliveryProblem, DeliveryCapacityProblem
-from planning_problem import max_level, PlanningProblem, null_heuristic
+from delivery_problem import DeliveryProblem, DeliveryCapacityProblem, \
+    BitmaskDeliveryProblem, BitmaskDeliveryCapacityProblem, \
+    KeyLocationDeliveryProblem
+from planning_problem import max_level, PlanningProblem, null_heuristic, \
+    ff_heuristic
 import preprocess_search
 from plots import compare, capacity_results
-from preprocess_planning import create_domain_problem_files
+from preprocess_planning import create_domain_problem, \
+    create_domain_problem_files
 from search import *
-from heuristics import maxPointAirDistHeuristic
+from heuristics import maxPointAirDistHeuristic, HEURISTICS
+from dynamic_programming import PickupDeliveryDP, MAX_ORDERS
+from graph_plan import GraphPlan
+from incremental_search import complete_path
 from search import a_star_search_planning
 
 
@@ -20,28 +30,34 @@ algorithms to find optimal delivery paths, based on various heuristics such as a
 and minimum spanning tree calculations.
 """
 
-def show_path(path):
+def show_path(path, problem=None):
     """
         Displays the path of moves taken.
+        Given the problem that produced it, the path is expanded back into road moves first.
     """
+    if problem is not None:
+        path = problem.expand_path(path)
     to_show = START_LOCATION
     for move in path:
         to_show += " -> " + move[1]
     print(to_show)
 
 
-def create_A_search_problems(commands):
+def create_A_search_problems(commands, bitmask=False):
     """
         Prepares the A* search problems based on input commands.
+        With bitmask, the problems use the compact bitmask state encoding.
     """
     map_routes, matrix, orders, points = read_input_files(commands)
     routes_ = preprocess_search.add_air_distances(map_routes, points, matrix)
+    routes_ = preprocess_search.add_shortest_paths(routes_)
+    problem_class = BitmaskDeliveryProblem if bitmask else DeliveryProblem
     problems_ = []
     for i in range(len(orders)):
         start_state = (
             START_LOCATION, [False for _ in orders[:i + 1]],
             [False for _ in orders[:i + 1]])
-        problems_.append(DeliveryProblem(start_state, orders[:i + 1], routes_))
+        problems_.append(problem_class(start_state, orders[:i + 1], routes_))
     return problems_, routes_
 
 
@@ -58,44 +74,39 @@ def read_input_files(commands):
         reader = csv.reader(file)
         data = list(reader)
     points = data[0][1:]  # The header row, without the first column
-    matrix = [' '.join(row[1:]) for row in data[1:]]
+    matrix = [row[1:] for row in data[1:]]
     return map_routes, matrix, orders, points
 
 
-def create_capacity_A_search_problems(commands):
+def create_planning_problem(commands, export=False):
     """
-        Prepares the A* search problems based on input commands.
+        Prepares planning problems for comparison, in memory. With export, the domain and problem
+        files of every problem are also written.
+        The compiled problems are cached in files keyed by the hash of the map and the orders, and
+        loaded from them without parsing when they exist with the current cache version.
     """
-    map_routes, matrix, orders, points = read_input_files(commands)
-    routes_ = preprocess_search.add_air_distances(map_routes, points, matrix)
+    with open(commands[0], "r") as map_file:
+        data = list(map_file)
+    with open(commands[2], "r") as orders_file:
+        orders = list(orders_file)
     problems_ = []
+    map_hash = hashlib.sha1("".join(data).encode())
     for i in range(len(orders)):
-        problems_.append([])
-        start_state = (
-            START_LOCATION, [False for _ in orders[:i + 1]],
-            [False for _ in orders[:i + 1]])
-        for j in range(8):
-            (problems_[-1]).append(
-                DeliveryCapacityProblem(start_state, orders[:i + 1], routes_, j + 1))
-    return problems_, routes_
-
-
-def create_planning_problem(commands):
-    """
-        Prepares planning problems for comparison.
-    """
-    map_file = open(commands[0], "r")
-    data = list(map_file)
-    orders_file = open(commands[2], "r")
-    orders = list(orders_file)
-    problems_ = []
-    for i in range(len(orders)):
-        create_domain_problem_files(commands[2], data, orders[:i + 1])
-        domain = DOMAIN + commands[2]
-        problem = PROBLEM + commands[2]
-        problems_.append(PlanningProblem(domain, problem))
-    map_file.close()
-    orders_file.close()
+        task_hash = map_hash.copy()
+        task_hash.update("".join(orders[:i + 1]).encode())
+        cache_file = PLANNING_TASK_CACHE % task_hash.hexdigest()
+        planning_problem = None
+        if not export and os.path.exists(cache_file):
+            planning_problem = PlanningProblem.load(cache_file)
+        if planning_problem is None:
+            if export:
+                domain, problem = create_domain_problem_files(commands[2], data,
+                                                              orders[:i + 1])
+            else:
+                domain, problem = create_domain_problem(data, orders[:i + 1])
+            planning_problem = PlanningProblem(domain, problem)
+            planning_problem.save(cache_file)
+        problems_.append(planning_problem)
     return problems_
 
 def run_num_orders(search, planning, num, routes, capacity, choice):
@@ -108,19 +119,53 @@ def run_num_orders(search, planning, num, routes, capacity, choice):
     choice(search, planning, num, routes, capacity)
 
 
-def a_star_plan(search, planning, num, routes, capacity):
+def a_star_plan(search, planning, num, routes, capacity,
+                heuristic=maxPointAirDistHeuristic, seed=None,
+                dominance=False):
     searcher = AStarSearch()
     search_problem = search[num - 1]
     if capacity != -1:
-        search_problem = DeliveryCapacityProblem(
+        capacity_class = DeliveryCapacityProblem
+        if isinstance(search_problem, BitmaskDeliveryProblem):
+            capacity_class = BitmaskDeliveryCapacityProblem
+        search_problem = capacity_class(
             search_problem.start_state, search_problem.orders,
             search_problem.map_routes, capacity)
     start_time = time.time()
     optimal_path, total_cost = searcher.a_star(search_problem,
-                                               heuristic=maxPointAirDistHeuristic)
+                                               heuristic=heuristic, seed=seed,
+                                               dominance=dominance)
+    end_time = time.time()
+    elapsed_time = (end_time - start_time)
+    print(A_STAR_PATH, total_cost, "in %.2f seconds" % elapsed_time, PATH)
+    show_path(optimal_path, search_problem)
+    print(EXPANDED_PRUNED % (search_problem.expanded, search_problem.pruned,
+                             search_problem.dominated))
+
+
+def macro_plan(search, planning, num, routes, capacity,
+               heuristic=maxPointAirDistHeuristic):
+    searcher = AStarSearch()
+    search_problem = KeyLocationDeliveryProblem(
+        search[num - 1].start_state, search[num - 1].orders, routes)
+    start_time = time.time()
+    optimal_path, total_cost = searcher.a_star(search_problem,
+                                               heuristic=heuristic)
     end_time = time.time()
     elapsed_time = (end_time - start_time)
     print(A_STAR_PATH, total_cost, "in %.2f seconds" % elapsed_time, PATH)
+    show_path(optimal_path, search_problem)
+
+def dp_plan(search, planning, num, routes, capacity):
+    search_problem = search[num - 1]
+    if len(search_problem.orders) > MAX_ORDERS:
+        print(DP_ORDERS_USAGE % MAX_ORDERS)
+        return
+    start_time = time.time()
+    optimal_path, total_cost = PickupDeliveryDP.solve(search_problem)
+    end_time = time.time()
+    elapsed_time = (end_time - start_time)
+    print(DP_PATH, total_cost, "in %.2f seconds" % elapsed_time, PATH)
     show_path(optimal_path)
 
 def planning_plan(search, planning, num, routes, capacity):
@@ -133,6 +178,33 @@ def planning_plan(search, planning, num, routes, capacity):
     end_time = time.time()
     elapsed_time = (end_time - start_time)
     check_plan(elapsed_time, plan, routes)
+    print(OPEN_PEAK % (planning_problem.open_peak,
+                       planning_problem.open_peak_bytes / 2 ** 20))
+
+def ff_plan(search, planning, num, routes, capacity):
+    planning_problem = planning[num - 1]
+    start_time = time.time()
+    plan = best_first_search_planning(planning_problem, ff_heuristic,
+                                      helpful_actions=True)
+    end_time = time.time()
+    elapsed_time = (end_time - start_time)
+    check_plan(elapsed_time, plan, routes)
+    print(OPEN_PEAK % (planning_problem.open_peak,
+                       planning_problem.open_peak_bytes / 2 ** 20))
+
+
+def graphplan_plan(search, planning, num, routes, capacity):
+    planning_problem = planning[num - 1]
+    start_time = time.time()
+    steps = GraphPlan(planning_problem).graph_plan()
+    end_time = time.time()
+    elapsed_time = (end_time - start_time)
+    plan = None
+    if steps is not None:
+        print(GRAPHPLAN_STEPS % len(steps))
+        plan = [action for step in steps for action in step]
+    check_plan(elapsed_time, plan, routes)
+
 
 def check_plan(elapsed_time, plan, routes):
     if plan is not None:
@@ -152,7 +224,8 @@ def check_plan(elapsed_time, plan, routes):
         print(PLAN_NOT_FOUND % elapsed_time)
 
 
-def user_problem(commands, capacity, choice, num=0):
+def user_problem(commands, capacity, choice, num=0, bitmask=False,
+                 planning=False, export=False):
     input(SHOW_MAP)
     show_map()
     user_orders = open(USERS_FILE, 'w')
@@ -160,8 +233,10 @@ def user_problem(commands, capacity, choice, num=0):
     print(INSTRUCTION)
     get_inputs(user_orders, num)
     user_orders.close()
-    problems_, routes_ = create_A_search_problems([commands[0], commands[1], USERS_FILE])
-    probs_ = create_planning_problem([commands[0], commands[1], USERS_FILE])
+    problems_, routes_ = create_A_search_problems(
+        [commands[0], commands[1], USERS_FILE], bitmask)
+    probs_ = create_planning_problem(
+        [commands[0], commands[1], USERS_FILE], export) if planning else None
     if len(problems_) > 0:
         run_num_orders(problems_, probs_, 0, routes_, capacity, choice)
     else:
@@ -238,11 +313,28 @@ def main():
     parser.add_option('--choice', dest='search_choice',
                       metavar='FUNC', help='search solution choice to use.',
                       type='choice',
-                      choices=['a_star', 'planning'], default='a_star')
+                      choices=[A_STAR, PLANNING, MACRO, DP, FF,
+                               GRAPHPLAN],
+                      default=A_STAR)
+    parser.add_option('--heuristic', dest='heuristic',
+                      help='the A* heuristic to use.', type='choice',
+                      choices=list(HEURISTICS), default='max')
     parser.add_option('--user', dest='user', type='int',
                       help='run the program in user input mode', default=0)
     parser.add_option('--results', dest='results', type='int',
                       help='run the results code', default=0)
+    parser.add_option('--bitmask', dest='bitmask', type='int',
+                      help='use the compact bitmask state encoding for A*',
+                      default=0)
+    parser.add_option('--bound', dest='bound', type='int',
+                      help='bound A* by a greedy nearest stop solution first',
+                      default=0)
+    parser.add_option('--dominance', dest='dominance', type='int',
+                      help='drop A* states dominated by another at their location',
+                      default=0)
+    parser.add_option('--export', dest='export', type='int',
+                      help='write the domain and problem files of planning',
+                      default=0)
 
     options, _ = parser.parse_args()
     if options.num == -1 and options.user == 0 and options.results == 0:
@@ -252,22 +344,39 @@ def main():
         print(RESULTS_USAGE)
         exit(1)
     commands = [options.map_file, options.air_distances_file,options.orders_file]
-    problems, routes = create_A_search_problems(commands)
-    probs = create_planning_problem(commands)
+    problems, routes = create_A_search_problems(commands,
+                                                options.bitmask == 1)
+    planning = options.search_choice in (PLANNING, FF, GRAPHPLAN) or \
+        options.results == 1
+    # the planning problems are only built when a planning solver runs
+    probs = create_planning_problem(commands, options.export == 1) \
+        if planning and options.user == 0 else None
 
-    choices = {A_STAR: a_star_plan, PLANNING: planning_plan}
+    heuristic = HEURISTICS[options.heuristic]
+    seed = complete_path if options.bound == 1 else None
+    choices = {A_STAR: functools.partial(a_star_plan, heuristic=heuristic,
+                                         seed=seed,
+                                         dominance=options.dominance == 1),
+               PLANNING: planning_plan,
+               MACRO: functools.partial(macro_plan, heuristic=heuristic),
+               DP: dp_plan,
+               FF: ff_plan,
+               GRAPHPLAN: graphplan_plan}
 
     if options.capacity != -1 and options.capacity <= 0:
         print(CAPACITY_USAGE)
         exit(1)
-    elif options.capacity != -1 and options.search_choice == PLANNING:
+    elif options.capacity != -1 and options.search_choice != A_STAR:
         print(CAPACITY_NOT_SUPPORTED)
         exit(1)
     elif options.user == 1 and options.num == -1:
-        user_problem(commands, options.capacity, choices[options.search_choice])
+        user_problem(commands, options.capacity, choices[options.search_choice],
+                     bitmask=options.bitmask == 1, planning=planning,
+                     export=options.export == 1)
     elif options.user == 1 and options.num > -1:
         user_problem(commands, options.capacity, choices[options.search_choice],
-                     options.num)
+                     options.num, options.bitmask == 1, planning,
+                     options.export == 1)
     elif options.user == 0 and options.num != -1:
         if options.num > 8 or options.num < 1:
             print(ORDERS_NUM_USAGE)
@@ -276,8 +385,7 @@ def main():
                        choices[options.search_choice])
     elif options.results == 1:
         compare(problems, probs, routes)
-        capacity_probs, _ = create_capacity_A_search_problems(commands)
-        capacity_results(capacity_probs)
+        capacity_results(problems)
     else:
         raise Exception('unrecognized options')
 
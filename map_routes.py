@@ -1,3 +1,11 @@
+import heapq
+import os
+
+import numpy as np
+
+FLOYD_WARSHALL_MAX_LOCATIONS = 400
+
+
 class MapRoutes:
     """
       A class to represent a map with routes and air distances between points.
@@ -8,25 +16,81 @@ class MapRoutes:
         Initializes the MapRoutes with empty dictionaries for routes and air distances.
         """
         self.routes = dict()
-        self.air_distances = dict()
+        self.air_matrix = np.zeros((0, 0))  # dense air distances
+        self.air_index = dict()  # location -> row/column of air_matrix
+        self.neighbors = dict()  # location -> [(neighbor, distance)]
+        self.location_ids = dict()  # location name -> interned integer id
+        self.locations = []  # interned integer id -> location name
+        self.id_neighbors = []  # location id -> [(neighbor id, distance)]
+        self.map_hash = None  # hash of the map file the routes were read from
+        self.road_distances = None  # location id x location id shortest road distances
+        self.next_hops = None  # location id x location id first step of a shortest road path
 
     def add_route(self, p1, p2, dist):
         """
         Adds a route between two points with a specified distance.
         """
-        self.routes[(min(p1, p2), max(p1, p2))] = dist
+        key = (min(p1, p2), max(p1, p2))
+        if key in self.routes:
+            self._update_neighbor(p1, p2, dist)
+            self._update_neighbor(p2, p1, dist)
+        else:
+            id1, id2 = self.location_id(key[0]), self.location_id(key[1])
+            self.neighbors.setdefault(key[0], []).append((key[1], dist))
+            self.id_neighbors[id1].append((id2, dist))
+            if id1 != id2:
+                self.neighbors.setdefault(key[1], []).append((key[0], dist))
+                self.id_neighbors[id2].append((id1, dist))
+        self.routes[key] = dist
+
+    def _update_neighbor(self, p, neighbor, dist):
+        """
+        Updates the distance of an existing neighbor entry in the adjacency index.
+        """
+        neighbor_id = self.location_id(neighbor)
+        self.neighbors[p] = [(n, dist if n == neighbor else d)
+                             for n, d in self.neighbors[p]]
+        p_id = self.location_id(p)
+        self.id_neighbors[p_id] = [(n, dist if n == neighbor_id else d)
+                                   for n, d in self.id_neighbors[p_id]]
+
+    def set_air_distances(self, points, matrix):
+        """
+        Sets the straight-line (air) distances between all the points at once, from a matrix
+        whose rows and columns follow the order of points.
+        """
+        self.air_index = {p: i for i, p in enumerate(points)}
+        self.air_matrix = np.array(matrix, dtype=float)
 
     def add_air_distance(self, p1, p2, dist):
         """
         Adds a straight-line (air) distance between two points.
         """
-        self.air_distances[(p1, p2)] = dist
+        for p in (p1, p2):
+            if p not in self.air_index:
+                self.air_index[p] = len(self.air_index)
+                self.air_matrix = np.pad(self.air_matrix, (0, 1),
+                                         constant_values=np.nan)
+        self.air_matrix[self.air_index[p1], self.air_index[p2]] = dist
 
     def air_distance(self, p1, p2):
         """
         Returns the straight-line (air) distance between two points.
         """
-        return self.air_distances[(p1, p2)]
+        return self.air_matrix.item(self.air_index[p1], self.air_index[p2])
+
+    def air_distances_from(self, p, points):
+        """
+        Returns a NumPy array of the straight-line (air) distances from p to each of points.
+        """
+        return self.air_matrix[self.air_index[p],
+                               [self.air_index[point] for point in points]]
+
+    def air_distance_matrix(self):
+        """
+        Returns the dense air distances matrix together with its location -> index table.
+        """
+        return self.air_matrix, self.air_index
 
     def get_distance(self, p1, p2):
         """
@@ -38,10 +102,142 @@ class MapRoutes:
         """
         Returns a list of all legal moves (adjacent points) from a given point.
         """
-        legal_moves = []
-        for p1, p2 in self.routes:
-            if p == p1:
-                legal_moves.append(p2)
-            elif p == p2:
-                legal_moves.append(p1)
-        return legal_moves
+        return [neighbor for neighbor, _ in self.neighbors.get(p, [])]
+
+    def get_neighbors(self, p):
+        """
+        Returns a list of (neighbor, distance) pairs for all the points adjacent to a given point.
+        """
+        return self.neighbors.get(p, [])
+
+    def get_neighbor_ids(self, location_id):
+        """
+        Returns a list of (neighbor id, distance) pairs for all the points adjacent to a given
+        interned location id.
+        """
+        return self.id_neighbors[location_id]
+
+    def location_id(self, p):
+        """
+        Returns the interned integer id of a location, assigning a new one on first use.
+        """
+        if p not in self.location_ids:
+            self.location_ids[p] = len(self.locations)
+            self.locations.append(p)
+            self.id_neighbors.append([])
+        return self.location_ids[p]
+
+    def location_name(self, location_id):
+        """
+        Returns the location name of an interned integer id.
+        """
+        return self.locations[location_id]
+
+    def set_map_hash(self, map_hash):
+        """
+        Sets the hash of the map file, used to key the shortest paths cache.
+        """
+        self.map_hash = map_hash
+
+    def compute_shortest_paths(self, cache_file=None):
+        """
+        Computes the all-pairs shortest road distances and next-hop tables over the interned
+        location ids, using a vectorized Floyd-Warshall on small or dense maps and repeated
+        Dijkstra on large sparse ones.
+        If cache_file exists and was computed for the same locations, the tables are loaded from
+        it instead; otherwise they are computed and saved to it.
+        """
+        if cache_file is not None and os.path.exists(cache_file):
+            with np.load(cache_file) as cache:
+                if list(cache['locations']) == self.locations:
+                    self.road_distances = cache['distances']
+                    self.next_hops = cache['next_hops']
+                    return
+        n = len(self.locations)
+        if n <= FLOYD_WARSHALL_MAX_LOCATIONS or 4 * len(self.routes) > n * n:
+            self._floyd_warshall()
+        else:
+            self._repeated_dijkstra()
+        if cache_file is not None:
+            with open(cache_file, 'wb') as f:
+                np.savez(f, locations=np.array(self.locations),
+                         distances=self.road_distances,
+                         next_hops=self.next_hops)
+
+    def _floyd_warshall(self):
+        """
+        Fills the shortest paths tables with Floyd-Warshall, relaxing every pair through each
+        intermediate location at once.
+        """
+        n = len(self.locations)
+        distances = np.full((n, n), np.inf)
+        next_hops = np.full((n, n), -1, dtype=np.int32)
+        for location_id in range(n):
+            distances[location_id, location_id] = 0
+            next_hops[location_id, location_id] = location_id
+            for neighbor_id, dist in self.id_neighbors[location_id]:
+                if dist < distances[location_id, neighbor_id]:
+                    distances[location_id, neighbor_id] = dist
+                    next_hops[location_id, neighbor_id] = neighbor_id
+        for k in range(n):
+            through_k = distances[:, k, None] + distances[None, k, :]
+            shorter = through_k < distances
+            distances = np.where(shorter, through_k, distances)
+            next_hops = np.where(shorter, next_hops[:, k, None], next_hops)
+        self.road_distances = distances
+        self.next_hops = next_hops
+
+    def _repeated_dijkstra(self):
+        """
+        Fills the shortest paths tables with one Dijkstra search from every location.
+        """
+        n = len(self.locations)
+        distances = np.full((n, n), np.inf)
+        next_hops = np.full((n, n), -1, dtype=np.int32)
+        for source in range(n):
+            dist = {source: 0}
+            first_hop = {source: source}
+            heap = [(0, source)]
+            done = set()
+            while heap:
+                d, location_id = heapq.heappop(heap)
+                if location_id in done:
+                    continue
+                done.add(location_id)
+                for neighbor_id, step in self.id_neighbors[location_id]:
+                    if d + step < dist.get(neighbor_id, float('inf')):
+                        dist[neighbor_id] = d + step
+                        first_hop[neighbor_id] = neighbor_id \
+                            if location_id == source else first_hop[location_id]
+                        heapq.heappush(heap, (d + step, neighbor_id))
+            for location_id in done:
+                distances[source, location_id] = dist[location_id]
+                next_hops[source, location_id] = first_hop[location_id]
+        self.road_distances = distances
+        self.next_hops = next_hops
+
+    def road_distance(self, p1, p2):
+        """
+        Returns the shortest road distance between two points, computing the shortest paths
+        tables on first use.
+        """
+        if self.road_distances is None:
+            self.compute_shortest_paths()
+        return self.road_distances.item(self.location_ids[p1],
+                                        self.location_ids[p2])
+
+    def road_path(self, p1, p2):
+        """
+        Returns the points of a shortest road path from p1 to p2, both included.
+        """
+        if self.next_hops is None:
+            self.compute_shortest_paths()
+        target = self.location_ids[p2]
+        location_id = self.location_ids[p1]
+        path = [p1]
+        while location_id != target:
+            location_id = self.next_hops.item(location_id, target)
+            if location_id < 0:
+                return None
+            path.append(self.locations[location_id])
+        return path
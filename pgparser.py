@@ -1,3 +1,5 @@
+import contextlib
+
 from proposition import Proposition
 
 
@@ -8,71 +10,74 @@ class PgParser:
 
     def __init__(self, domain_file, problem_file):
         """
-         Constructor to initialize the parser with domain and problem files.
+         Constructor to initialize the parser with domain and problem files, given by their names or
+         as lists of their lines.
         """
         self.domain_file = domain_file
         self.problem_file = problem_file
 
+    @staticmethod
+    @contextlib.contextmanager
+    def open_lines(source):
+        """
+        Opens a file name, or a list of lines, as an iterator over its lines, and closes the file
+        when done.
+        """
+        if isinstance(source, str):
+            with open(source, 'r') as f:
+                yield f
+        else:
+            yield iter(source)
+
+    @staticmethod
+    def split_words(line):
+        """
+        Returns the words of a line.
+        """
+        return [word.rstrip() for word in line.split(" ") if
+                len(word.rstrip()) > 0]
+
     def parse_actions_and_propositions(self):
         """
             Parses the domain file specified by self.domain_file to extract Proposition and Action objects.
             Updates actions with the corresponding Proposition instances for their preconditions, add effects,
-            and delete effects.
+            and delete effects, which keep the order of the propositions list.
         """
         propositions = []
-        f = open(self.domain_file, 'r')
-        _ = f.readline()
-        proposition_line = f.readline()
-        words = [word.rstrip() for word in proposition_line.split(" ") if
-                 len(word.rstrip()) > 0]
-        for i in range(0, len(words)):
-            propositions.append(Proposition(words[i]))
+        positions = dict()  # proposition name -> its positions in the propositions list
         actions = []
-        f = open(self.domain_file, 'r')
-        line = f.readline()
-        while line != '':
-            words = [word.rstrip() for word in line.split(" ") if
-                     len(word.rstrip()) > 0]
-            if words[0] == 'Name:':
+        with self.open_lines(self.domain_file) as f:
+            _ = next(f, '')
+            for word in self.split_words(next(f, '')):
+                positions.setdefault(word, []).append(len(propositions))
+                propositions.append(Proposition(word))
+            for line in f:
+                words = self.split_words(line)
+                if not words or words[0] != 'Name:':
+                    continue
                 name = words[1]
-                line = f.readline()
-                precond = []
-                add = []
-                delete = []
-                words = [word.rstrip() for word in line.split(" ") if
-                         len(word.rstrip()) > 0]
-                for i in range(1, len(words)):
-                    precond.append(Proposition(words[i]))
-                line = f.readline()
-                words = [word.rstrip() for word in line.split(" ") if
-                         len(word.rstrip()) > 0]
-                for i in range(1, len(words)):
-                    add.append(Proposition(words[i]))
-                line = f.readline()
-                words = [word.rstrip() for word in line.split(" ") if
-                         len(word.rstrip()) > 0]
-                for i in range(1, len(words)):
-                    delete.append(Proposition(words[i]))
-                act = Action(name, precond, add, delete)
-                for prop in add:
-                    self.find_prop_by_name(prop, propositions).add_producer(
-                        act)
+                precond = self.split_words(next(f, ''))[1:]
+                add = self.split_words(next(f, ''))[1:]
+                delete = self.split_words(next(f, ''))[1:]
+                act = Action(name, self.resolve(precond, positions, propositions),
+                             self.resolve(add, positions, propositions),
+                             self.resolve(delete, positions, propositions))
+                for prop_name in add:
+                    propositions[positions[prop_name][0]].add_producer(act)
                 actions.append(act)
-            line = f.readline()
-
-        for a in actions:
-            new_pre = [p for p in propositions if
-                       p.name in [q.name for q in a.pre]]
-            new_add = [p for p in propositions if
-                       p.name in [q.name for q in a.add]]
-            new_delete = [p for p in propositions if
-                          p.name in [q.name for q in a.delete]]
-            a.pre = new_pre
-            a.add = new_add
-            a.delete = new_delete
-
         return [actions, propositions]
 
+    @staticmethod
+    def resolve(names, positions, propositions):
+        """
+        Returns the propositions of the propositions list named by a list of names, in the order of
+        the propositions list.
+        """
+        indices = set()
+        for name in names:
+            indices.update(positions.get(name, ()))
+        return [propositions[i] for i in sorted(indices)]
+
     @staticmethod
     def find_prop_by_name(name, propositions):
         for prop in propositions:
@@ -81,23 +86,14 @@ class PgParser:
 
     def parse_problem(self):
         """
-            Parses the domain file specified by self.domain_file to extract Proposition and Action objects.
-            Updates actions with the corresponding Proposition instances for their preconditions, add effects,
-            and delete effects.
+            Parses the problem file specified by self.problem_file to extract the initial state and
+            the goal state as lists of Proposition objects.
             """
-        init = []
-        goal = []
-        f = open(self.problem_file, 'r')
-        line = f.readline()
-        words = [word.rstrip() for word in line.split(" ") if
-                 len(word.rstrip()) > 0]
-        for i in range(2, len(words)):
-            init.append(Proposition(words[i]))
-        line = f.readline()
-        words = [word.rstrip() for word in line.split(" ") if
-                 len(word.rstrip()) > 0]
-        for i in range(2, len(words)):
-            goal.append(Proposition(words[i]))
+        with self.open_lines(self.problem_file) as f:
+            init = [Proposition(word)
+                    for word in self.split_words(next(f, ''))[2:]]
+            goal = [Proposition(word)
+                    for word in self.split_words(next(f, ''))[2:]]
         return init, goal
 
 
@@ -118,6 +114,9 @@ class Action(object):
         self.delete = delete  # list of the propositions that will be deleted after applying the action
         self.name = name  # the name of the action as string
         self.noOp = is_noop  # true if the action is a noOp
+        self.pre_mask = 0  # bitset of the preconditions, set when the planning task is compiled
+        self.add_mask = 0  # bitset of the propositions to add
+        self.delete_mask = 0  # bitset of the propositions to delete
 
     def get_pre(self):
         """
@@ -143,6 +142,26 @@ class Action(object):
         """
         return self.name
 
+    def set_masks(self, pre_mask, add_mask, delete_mask):
+        """
+        Sets the bitsets of the preconditions, add effects and delete effects of the action.
+        """
+        self.pre_mask = pre_mask
+        self.add_mask = add_mask
+        self.delete_mask = delete_mask
+
+    def is_applicable(self, state):
+        """
+        Checks if all preconditions of the action hold in a bitset state.
+        """
+        return state & self.pre_mask == self.pre_mask
+
+    def apply(self, state):
+        """
+        Returns the bitset state reached by applying the action to a bitset state.
+        """
+        return (state & ~self.delete_mask) | self.add_mask
+
     def is_pre_cond(self, prop):
         """
          Checks if a proposition is a precondition for the action.
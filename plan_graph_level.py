@@ -1,23 +1,20 @@
-from util import Pair
+import numpy as np
+
 from proposition import Proposition
 from proposition_layer import PropositionLayer
+from util import MutexMatrix
 
 
 class PlanGraphLevel(object):
     """
     A class for representing a level in the plan graph.
     For each level i, the PlanGraphLevel consists of the actionLayer and propositionLayer at this level in this order!
+    The mutexes of the layers are boolean matrices, computed with matrix operations over the boolean
+    matrices of the preconditions, add effects and delete effects of the actions.
     """
-    independent_actions = set()  # updated to the independent_actions of the problem (graph_plan.py line 32)
-    actions = []  # updated to the actions of the problem (graph_plan.py line 33 and planning_problem.py line 36)
-    props = []  # updated to the propositions of the problem (graph_plan.py line 34 and planning_problem.py line 36)
-
-    @staticmethod
-    def set_independent_actions(independent_actions):
-        """
-        Sets the independent_actions attribute.
-        """
-        PlanGraphLevel.independent_actions = independent_actions
+    actions = []  # updated to the actions of the problem (planning_problem.py line 48)
+    props = []  # updated to the propositions of the problem (planning_problem.py line 49)
+    matrices = None  # the ActionMatrices of the actions and props, compiled when first needed
 
     @staticmethod
     def set_actions(actions):
@@ -25,6 +22,7 @@ class PlanGraphLevel(object):
         Sets the actions attribute.
         """
         PlanGraphLevel.actions = actions
+        PlanGraphLevel.matrices = None
 
     @staticmethod
     def set_props(props):
@@ -32,6 +30,17 @@ class PlanGraphLevel(object):
         Sets the props attribute.
         """
         PlanGraphLevel.props = props
+        PlanGraphLevel.matrices = None
+
+    @staticmethod
+    def get_matrices():
+        """
+        Returns the ActionMatrices of the actions and props, compiling them if needed.
+        """
+        if PlanGraphLevel.matrices is None:
+            PlanGraphLevel.matrices = ActionMatrices(PlanGraphLevel.actions,
+                                                     PlanGraphLevel.props)
+        return PlanGraphLevel.matrices
 
     def __init__(self):
         """
@@ -59,92 +68,82 @@ class PlanGraphLevel(object):
     def update_action_layer(self, previous_proposition_layer):
         """
         Updates the action layer given the previous proposition layer (see proposition_layer.py)
-        You should add an action to the layer if its preconditions are in the previous propositions layer,
+        An action is added to the layer if its preconditions are in the previous propositions layer,
         and the preconditions are not pairwise mutex.
-        all_actions is the set of all the action (include noOp) in the domain
-        You might want to use those functions:
-        previous_proposition_layer.is_mutex(prop1, prop2) returns true
-        if prop1 and prop2 are mutex at the previous propositions layer
-        previous_proposition_layer.all_preconds_in_layer(action) returns true
-        if all the preconditions of action are in the previous propositions layer
-        self.actionLayer.addAction(action) adds action to the current action layer
-        """
-        all_actions = PlanGraphLevel.actions
-        for action in all_actions:
-            preconditions = action.get_pre()
-            is_mutex = False
-            for p1 in preconditions:
-                for p2 in preconditions:
-                    if p1 != p2 and previous_proposition_layer.is_mutex(p1,
-                                                                        p2):
-                        is_mutex = True
-                        break
-                if is_mutex:
-                    break
-
-            if previous_proposition_layer.all_preconds_in_layer(
-                    action) and not is_mutex:
-                self.action_layer.add_action(action)
-
-    def update_mutex_actions(self, previous_layer_mutex_proposition):
-        """
-        Updates the mutex set in self.action_layer,
-        given the mutex proposition from the previous layer.
-        current_layer_actions are the actions in the current action layer
-        You might want to use this function:
-        self.actionLayer.add_mutex_actions(action1, action2)
-        adds the pair (action1, action2) to the mutex set in the current action layer
+        """
+        matrices = PlanGraphLevel.get_matrices()
+        prev_ids = matrices.prop_ids_of(
+            previous_proposition_layer.get_proposition_list())
+        present = np.zeros(len(matrices.prop_ids), dtype=bool)
+        present[prev_ids] = True
+        candidates = np.flatnonzero(~(matrices.pre & ~present).any(axis=1))
+        prev_mutex = previous_proposition_layer.get_mutex_matrix()
+        if prev_mutex.any():
+            pre = matrices.pre[np.ix_(candidates, prev_ids)].astype(np.float32)
+            mutex_pre = ((pre @ prev_mutex.astype(np.float32)) * pre).any(axis=1)
+            candidates = candidates[~mutex_pre]
+        for action_id in candidates:
+            self.action_layer.add_action(PlanGraphLevel.actions[action_id])
+
+    def update_mutex_actions(self, previous_proposition_layer):
+        """
+        Updates the mutex matrix of self.action_layer, given the previous proposition layer.
+        Two actions are mutex if one deletes a precondition or an add effect of the other
+        (interference and inconsistent effects), or if they have competing needs, mutex
+        preconditions in the previous layer.
         Note that an action is *not* mutex with itself
         """
-        current_layer_actions = self.action_layer.get_actions()
-        for action1 in current_layer_actions:
-            for action2 in current_layer_actions:
-                if action1 != action2 and mutex_actions(action1, action2,
-                                                        previous_layer_mutex_proposition):
-                    self.action_layer.add_mutex_actions(action1, action2)
+        matrices = PlanGraphLevel.get_matrices()
+        action_ids = matrices.action_ids_of(self.action_layer.get_action_list())
+        prev_ids = matrices.prop_ids_of(
+            previous_proposition_layer.get_proposition_list())
+        delete = matrices.delete[action_ids]
+        touched = np.flatnonzero(delete.any(axis=0))  # the deleted propositions
+        delete = delete[:, touched].astype(np.float32)
+        needed = (matrices.pre[np.ix_(action_ids, touched)]
+                  | matrices.add[np.ix_(action_ids, touched)]).astype(np.float32)
+        mutex = (delete @ needed.T) > 0
+        mutex |= mutex.T
+        prev_mutex = previous_proposition_layer.get_mutex_matrix()
+        if prev_mutex.any():
+            pre = matrices.pre[np.ix_(action_ids, prev_ids)].astype(np.float32)
+            mutex |= (pre @ prev_mutex.astype(np.float32) @ pre.T) > 0
+        np.fill_diagonal(mutex, False)
+        self.action_layer.set_mutex_matrix(mutex)
 
     def update_proposition_layer(self):
         """
         Updates the propositions in the current proposition layer,
-        given the current action layer.
-        don't forget to update the producers list!
+        given the current action layer, with their producers.
         Note that same proposition in different layers might have different producers lists,
-        hence you should create two different instances.
-        current_layer_actions is the set of all the actions in the current layer.
-        You might want to use those functions:
-        dict() creates a new dictionary that might help to keep track on the propositions that you've
-               already added to the layer
-        self.proposition_layer.add_proposition(prop) adds the proposition prop to the current layer
-
-        """
-        current_layer_actions = self.action_layer.get_actions()
-        props_dict = dict()
-
-        for action in current_layer_actions:
-            for p in action.get_add():
-                prop_name = p.get_name()
-                if prop_name not in props_dict:
-                    prop = Proposition(prop_name)
-                    props_dict[prop_name] = prop
-                    self.proposition_layer.add_proposition(prop)
-                props_dict[prop_name].add_producer(action)
+        hence two different instances are created.
+        """
+        matrices = PlanGraphLevel.get_matrices()
+        current_layer_actions = self.action_layer.get_action_list()
+        action_ids = matrices.action_ids_of(current_layer_actions)
+        add = matrices.add[action_ids]
+        prop_ids = np.flatnonzero(add.any(axis=0))
+        props = [Proposition(PlanGraphLevel.props[prop_id].get_name())
+                 for prop_id in prop_ids]
+        for action_index, prop_index in zip(*np.nonzero(add[:, prop_ids])):
+            props[prop_index].add_producer(current_layer_actions[action_index])
+        for prop in props:
+            self.proposition_layer.add_proposition(prop)
 
     def update_mutex_proposition(self):
         """
-        updates the mutex propositions in the current proposition layer
-        You might want to use those functions:
-        mutex_propositions(prop1, prop2, current_layer_mutex_actions) returns true
-        if prop1 and prop2 are mutex in the current layer
-        self.proposition_layer.add_mutex_prop(prop1, prop2) adds the pair (prop1, prop2)
-        to the mutex set of the current layer
-        """
-        current_layer_propositions = self.proposition_layer.get_propositions()
-        current_layer_mutex_actions = self.action_layer.get_mutex_actions()
-        for prop1 in current_layer_propositions:
-            for prop2 in current_layer_propositions:
-                if prop1 != prop2 and mutex_propositions(prop1, prop2,
-                                                         current_layer_mutex_actions):
-                    self.proposition_layer.add_mutex_prop(prop1, prop2)
+        Updates the mutex matrix of the current proposition layer: two propositions are mutex if
+        every pair of their producers is mutex in the current action layer.
+        """
+        matrices = PlanGraphLevel.get_matrices()
+        action_ids = matrices.action_ids_of(self.action_layer.get_action_list())
+        prop_ids = matrices.prop_ids_of(
+            self.proposition_layer.get_proposition_list())
+        add = matrices.add[np.ix_(action_ids, prop_ids)].astype(np.float32)
+        compatible = (~self.action_layer.get_mutex_matrix()).astype(np.float32)
+        mutex = (add.T @ compatible @ add) == 0
+        np.fill_diagonal(mutex, False)
+        self.proposition_layer.set_mutex_matrix(mutex)
 
     def expand(self, previous_layer):
         """
@@ -156,9 +155,8 @@ class PlanGraphLevel(object):
         set the propositions and their mutex relations in the proposition layer.
         """
         previous_proposition_layer = previous_layer.get_proposition_layer()
-        previous_layer_mutex_proposition = previous_proposition_layer.get_mutex_props()
         self.update_action_layer(previous_proposition_layer)
-        self.update_mutex_actions(previous_layer_mutex_proposition)
+        self.update_mutex_actions(previous_proposition_layer)
         self.update_proposition_layer()
         self.update_mutex_proposition()
 
@@ -173,56 +171,46 @@ class PlanGraphLevel(object):
         "*** YOUR CODE HERE ***"
 
 
-def mutex_actions(a1, a2, mutex_props):
+class ActionMatrices(object):
     """
-    This function returns true if a1 and a2 are mutex actions.
-    We first check whether a1 and a2 are in PlanGraphLevel.independent_actions,
-    this is the list of all the independent pair of actions (according to your implementation in question 1).
-    If not, we check whether a1 and a2 have competing needs
+    The boolean matrices of the preconditions, add effects and delete effects of a list of actions,
+    with a row per action and a column per proposition of a list of propositions.
     """
-    if Pair(a1, a2) not in PlanGraphLevel.independent_actions:
-        return True
-    return have_competing_needs(a1, a2, mutex_props)
-
 
-def have_competing_needs(a1, a2, mutex_props):
-    """
-    Complete code for deciding whether actions a1 and a2 have competing needs,
-    given the mutex proposition from previous level (list of pairs of propositions).
-    Hint: for propositions p  and q, the command  "Pair(p, q) in mutex_props"
-          returns true if p and q are mutex in the previous level
-    """
-    "*** YOUR CODE HERE ***"
-    for pre1 in a1.get_pre():
-        for pre2 in a2.get_pre():
-            if Pair(pre1, pre2) in mutex_props:
-                return True
-    return False
-
-
-def mutex_propositions(prop1, prop2, mutex_actions_list):
-    """
-    complete code for deciding whether two propositions are mutex,
-    given the mutex action from the current level (set of pairs of actions).
-    Your update_mutex_proposition function should call this function
-    You might want to use this function:
-    prop1.get_producers() returns the set of all the possible actions in the layer that have prop1 on their add list
-    # """
-    "*** YOUR CODE HERE ***"
-    if prop1 == prop2:
-        return False
-    for ac1 in prop1.get_producers():
-        for ac2 in prop2.get_producers():
-            if Pair(ac1, ac2) not in mutex_actions_list:
-                return False
+    def __init__(self, actions, props):
+        """
+        Constructor
+        """
+        self.action_ids = {action: i for i, action in enumerate(actions)}
+        self.prop_ids = dict()  # proposition -> its column
+        for prop in props:
+            self.prop_ids.setdefault(prop, len(self.prop_ids))
+        shape = (len(actions), len(self.prop_ids))
+        self.pre = np.zeros(shape, dtype=bool)
+        self.add = np.zeros(shape, dtype=bool)
+        self.delete = np.zeros(shape, dtype=bool)
+        for i, action in enumerate(actions):
+            for matrix, effect in ((self.pre, action.get_pre()), (self.add, action.get_add()),
+                                   (self.delete, action.get_delete())):
+                matrix[i, [self.prop_ids[prop] for prop in effect]] = True
+
+    def action_ids_of(self, actions):
+        """
+        Returns the array of the rows of a list of actions.
+        """
+        return np.array([self.action_ids[action] for action in actions], dtype=np.intp)
 
-    return True
+    def prop_ids_of(self, props):
+        """
+        Returns the array of the columns of a list of propositions.
+        """
+        return np.array([self.prop_ids[prop] for prop in props], dtype=np.intp)
 
 
 class ActionLayer(object):
     """
     A class for an ActionLayer in a level of the graph.
-    The layer contains a set of actions (action objects) and a set of mutex actions (Pair objects)
+    The layer contains a set of actions (action objects) and a boolean matrix of the mutex actions
     """
 
     def __init__(self):
@@ -230,29 +218,40 @@ class ActionLayer(object):
         Constructor
         """
         self.actions = set()  # set of all the actions in the layer
-        self.mutexActions = set()  # set of pairs of action that are mutex in the layer
+        self.mutexActions = MutexMatrix()  # the actions in the order they were added, with their mutex matrix
 
     def add_action(self, act):  # adds the action act to the actions set
-        self.actions.add(act)
+        if self.mutexActions.add(act):
+            self.actions.add(act)
 
     def remove_actions(self, act):  # removes the action act to the actions set
         self.actions.remove(act)
+        self.mutexActions.remove(act)
 
     def get_actions(self):  # returns the actions set
         return self.actions
 
-    def get_mutex_actions(self):  # returns the mutex actions set
-        return self.mutexActions
+    def get_action_list(self):  # returns the actions in the order of the rows of the mutex matrix
+        return self.mutexActions.items
+
+    def get_mutex_actions(self):  # returns the set of pairs of mutex actions
+        return self.mutexActions.pairs()
+
+    def get_mutex_matrix(self):  # returns the boolean mutex matrix over the action list
+        return self.mutexActions.get_matrix()
+
+    def set_mutex_matrix(self, matrix):
+        self.mutexActions.set_matrix(matrix)
 
     def add_mutex_actions(self, a1,
-                          a2):  # add the pair (a1,a2) to the mutex actions set
-        self.mutexActions.add(Pair(a1, a2))
+                          a2):  # add the pair (a1,a2) to the mutex actions
+        self.mutexActions.set_mutex(a1, a2)
 
     def is_mutex(self, pair):
         """
         Returns true if the pair of actions are mutex in this action layer
         """
-        return pair in self.mutexActions
+        return self.mutexActions.is_mutex(pair.a, pair.b)
 
     def effect_exists(self, prop):
         """
@@ -265,7 +264,8 @@ class ActionLayer(object):
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
-                and self.__dict__ == other.__dict__)
+                and self.actions == other.actions
+                and self.get_mutex_actions() == other.get_mutex_actions())
 
     def __ne__(self, other):
         return not self.__eq__(other)
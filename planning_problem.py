@@ -1,6 +1,11 @@
-from proposition_layer import PropositionLayer
+import numpy as np
+
 from plan_graph_level import PlanGraphLevel
 from pgparser import PgParser, Action
+from proposition import Proposition
+from relaxed_planning_graph import RelaxedPlanningGraph
+
+CACHE_VERSION = 2  # the layout of the cache files written by PlanningProblem.save
 
 
 class PlanningProblem:
@@ -9,27 +14,101 @@ class PlanningProblem:
        Manages actions, propositions, initial state, and goal state.
     """
 
-    def __init__(self, domain_file, problem_file):
+    def __init__(self, domain_file, problem_file, task=None):
         """
-        Constructor
+        Constructor. A task, the (actions, propositions, initial state, goal state) of an already
+        parsed problem, is used instead of the domain and problem files.
         """
-        p = PgParser(domain_file, problem_file)
-        self.actions, self.propositions = p.parse_actions_and_propositions()
+        if task is None:
+            p = PgParser(domain_file, problem_file)
+            task = p.parse_actions_and_propositions() + list(p.parse_problem())
+        self.actions, self.propositions, initial_state, goal = task
         # list of all the actions and list of all the propositions
-
-        initial_state, goal = p.parse_problem()
         # the initial state and the goal state are lists of propositions
 
-        self.initialState = frozenset(initial_state)
         self.goal = frozenset(goal)
 
         self.create_noops()
         # creates noOps that are used to propagate existing propositions from one layer to the next
 
+        self.prop_ids = {prop: i for i, prop in enumerate(self.propositions)}
+        # each proposition is a bit of the states, which are ints used as bitsets
+        for action in self.actions:
+            action.set_masks(self.mask_of(action.get_pre()),
+                             self.mask_of(action.get_add()),
+                             self.mask_of(action.get_delete()))
+        self.initialState = self.mask_of(initial_state)
+        self.goal_mask = self.mask_of(goal)
+
+        self.search_actions = [action for action in self.actions
+                               if not action.is_noop()]
+        # the actions the search applies, the noOps only serve the plan graph
+        self.create_precondition_index()
+        self.relaxed_planning_graph = RelaxedPlanningGraph(self)
+        # used by the max_level and level_sum heuristics
+
         PlanGraphLevel.set_actions(self.actions)
         PlanGraphLevel.set_props(self.propositions)
         self.expanded = 0
 
+    def save(self, cache_file):
+        """
+        Saves the compiled task to a cache file: the cache version, the proposition names, the
+        action names with the proposition ids of their preconditions, add effects and delete
+        effects, and the proposition ids of the initial state and the goal state.
+        """
+        arrays = {'version': np.array(CACHE_VERSION),
+                  'propositions': np.array([prop.name for prop in self.propositions]),
+                  'action_names': np.array([action.name for action in self.search_actions])}
+        for field, get in (('pre', Action.get_pre), ('add', Action.get_add),
+                           ('delete', Action.get_delete)):
+            ids = [[self.prop_ids[prop] for prop in get(action)]
+                   for action in self.search_actions]
+            arrays[field + '_ids'] = np.array(
+                [prop_id for action_ids in ids for prop_id in action_ids], dtype=np.int32)
+            arrays[field + '_counts'] = np.array(
+                [len(action_ids) for action_ids in ids], dtype=np.int32)
+        arrays['initial_ids'] = np.array(
+            [self.prop_ids[prop] for prop in self.state_propositions(self.initialState)],
+            dtype=np.int32)
+        arrays['goal_ids'] = np.array(sorted(self.prop_ids[prop] for prop in self.goal),
+                                      dtype=np.int32)
+        with open(cache_file, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, cache_file):
+        """
+        Creates a planning problem from a cache file written by save, without parsing. Returns
+        None if the file was written with another cache version, so it is rebuilt.
+        """
+        with np.load(cache_file) as cache:
+            if 'version' not in cache.files or int(cache['version']) != CACHE_VERSION:
+                return None
+            propositions = [Proposition(name) for name in cache['propositions'].tolist()]
+            by_name = dict()  # the producers are set on the first proposition of each name
+            for prop in propositions:
+                by_name.setdefault(prop.name, prop)
+            effects = dict()
+            for field in ('pre', 'add', 'delete'):
+                ids = cache[field + '_ids'].tolist()
+                effects[field] = []
+                start = 0
+                for count in cache[field + '_counts'].tolist():
+                    effects[field].append([propositions[prop_id]
+                                           for prop_id in ids[start:start + count]])
+                    start += count
+            actions = []
+            for name, pre, add, delete in zip(cache['action_names'].tolist(), effects['pre'],
+                                              effects['add'], effects['delete']):
+                action = Action(name, pre, add, delete)
+                for prop in add:
+                    by_name[prop.name].add_producer(action)
+                actions.append(action)
+            initial_state = [propositions[prop_id] for prop_id in cache['initial_ids'].tolist()]
+            goal = [propositions[prop_id] for prop_id in cache['goal_ids'].tolist()]
+        return cls(None, None, (actions, propositions, initial_state, goal))
+
     def get_start_state(self):
         """
         Returns the initial state of the planning problem.
@@ -38,10 +117,32 @@ class PlanningProblem:
 
     def is_goal_state(self, state):
         """
-        Checks if the given state satisfies the goal state.
+        Checks if the given state, a bitset or a collection of propositions, satisfies the goal state.
         """
+        if isinstance(state, int):
+            return state & self.goal_mask == self.goal_mask
         return not self.goal_state_not_in_prop_layer(state)
 
+    def mask_of(self, propositions):
+        """
+        Returns the bitset of a collection of propositions.
+        """
+        mask = 0
+        for prop in propositions:
+            mask |= 1 << self.prop_ids[prop]
+        return mask
+
+    def state_propositions(self, state):
+        """
+        Returns the list of propositions of a bitset state.
+        """
+        propositions = []
+        while state:
+            low_bit = state & -state
+            propositions.append(self.propositions[low_bit.bit_length() - 1])
+            state ^= low_bit
+        return propositions
+
     def get_successors(self, state):
         """
         Returns a list of triples,
@@ -51,18 +152,30 @@ class PlanningProblem:
         cost of expanding to that successor, 1 in our case.
         """
         self.expanded += 1
+        candidates = list(self.unconditional_actions)
+        rest = state
+        while rest:
+            low_bit = rest & -rest
+            candidates.extend(
+                self.actions_by_pre.get(low_bit.bit_length() - 1, ()))
+            rest ^= low_bit
+        candidates.sort()
         successors = []
-        for action in self.actions:
-            if action.is_noop() or not action.all_preconds_in_list(state):
-                continue
-            successor_state = set(state)
-            for prop_to_delete in action.get_delete():
-                successor_state.discard(prop_to_delete)
-            for prop_to_add in action.get_add():
-                successor_state.add(prop_to_add)
-            successors.append((frozenset(successor_state), action, 1))
+        for _, action in candidates:
+            if action.is_applicable(state):
+                successors.append((action.apply(state), action, 1))
         return successors
 
+    def helpful_actions(self, state):
+        """
+        Returns the set of the helpful actions of a state, the applicable actions that achieve a
+        sub-goal of the first level of its relaxed plan.
+        """
+        relaxed_plan = self.relaxed_planning_graph.relaxed_plan(state)
+        if relaxed_plan is None:
+            return set()
+        return relaxed_plan[1]
+
     @staticmethod
     def get_cost_of_actions(actions):
         return len(actions)
@@ -77,6 +190,28 @@ class PlanningProblem:
                 return True
         return False
 
+    def create_precondition_index(self):
+        """
+        Indexes every search action under one of its preconditions, the one required by the fewest
+        actions, so get_successors only examines the actions of the propositions that hold.
+        Index entries are (position in search_actions, action) pairs, to keep the successors in the
+        order of the actions.
+        """
+        requiring = dict()  # proposition id -> number of actions requiring it
+        for action in self.search_actions:
+            for prop in action.get_pre():
+                prop_id = self.prop_ids[prop]
+                requiring[prop_id] = requiring.get(prop_id, 0) + 1
+        self.actions_by_pre = dict()
+        self.unconditional_actions = []
+        for position, action in enumerate(self.search_actions):
+            pre_ids = [self.prop_ids[prop] for prop in action.get_pre()]
+            if not pre_ids:
+                self.unconditional_actions.append((position, action))
+                continue
+            key = min(pre_ids, key=lambda prop_id: requiring[prop_id])
+            self.actions_by_pre.setdefault(key, []).append((position, action))
+
     def create_noops(self):
         """
         Creates the noOps that are used to propagate propositions from one layer to the next
@@ -96,31 +231,10 @@ def max_level(state, planning_problem):
     """
     The heuristic value is the number of layers required to expand all goal propositions.
     """
-    prop_layer_init = PropositionLayer()  # Create a new proposition layer
-    for prop in state:
-        prop_layer_init.add_proposition(
-            prop)  # Update the proposition layer with the propositions of the state
-
-    pg_init = PlanGraphLevel()  # Create a new plan graph level
-    pg_init.set_proposition_layer(
-        prop_layer_init)  # Update the new plan graph level with the proposition layer
-
-    level = 0
-    while not planning_problem.is_goal_state(
-            pg_init.get_proposition_layer().get_propositions()):
-        prev_props = pg_init.get_proposition_layer().get_propositions()  # Get current propositions
-
-        pg_next = PlanGraphLevel()  # Create a new next level plan graph
-        pg_next.expand_without_mutex(
-            pg_init)  # Expand without computing mutex relations
-        pg_init = pg_next  # Move to the next level
-        level += 1
-
-        current_props = pg_init.get_proposition_layer().get_propositions()  # Get new propositions
-        if len(current_props) == len(prev_props):
-            return float(
-                'inf')  # If no changes, return infinity (goal not reachable)
-    return level
+    goal_levels = planning_problem.relaxed_planning_graph.goal_levels(state)
+    if goal_levels is None:
+        return float('inf')  # goal not reachable
+    return max(goal_levels, default=0)
 
 
 def level_sum(state, planning_problem):
@@ -128,60 +242,35 @@ def level_sum(state, planning_problem):
     The heuristic value is the sum of sub-goals level they first appeared.
     If the goal is not reachable from the state your heuristic should return float('inf')
     """
-    prop_layer_init = PropositionLayer()  # Create a new proposition layer
-    for prop in state:
-        prop_layer_init.add_proposition(
-            prop)  # Update the proposition layer with the propositions of the state
-
-    pg_init = PlanGraphLevel()  # Create a new plan graph level
-    pg_init.set_proposition_layer(
-        prop_layer_init)  # Update the new plan graph level with the proposition layer
-
-    goal_levels = {goal: None for goal in
-                   planning_problem.goal}  # Dictionary to track the level of each goal proposition
-    level = 0
-
-    while True:
-        current_props = pg_init.get_proposition_layer().get_propositions()  # Get current propositions
-
-        # Check if all goal propositions have been assigned a level
-        all_goals_found = True
-        for goal in planning_problem.goal:
-            if goal in current_props and goal_levels[goal] is None:
-                goal_levels[goal] = level
-        for goal in goal_levels.values():
-            if goal is None:
-                all_goals_found = False
-                break
-
-        if all_goals_found:
-            total_level_sum = 0
-            for goal_level in goal_levels.values():
-                total_level_sum += goal_level
-            return total_level_sum
-
-        # Expand to the next level
-        prev_props = current_props
-        pg_next = PlanGraphLevel()  # Create a new next level plan graph
-        pg_next.expand_without_mutex(
-            pg_init)  # Expand without computing mutex relations
-        pg_init = pg_next  # Move to the next level
-        level += 1
-
-        # If no changes, return infinity (goal not reachable)
-        if len(pg_init.get_proposition_layer().get_propositions()) == len(
-                prev_props):
-            return float('inf')
+    goal_levels = planning_problem.relaxed_planning_graph.goal_levels(state)
+    if goal_levels is None:
+        return float('inf')  # goal not reachable
+    return sum(goal_levels)
+
+
+def ff_heuristic(state, planning_problem):
+    """
+    The heuristic value is the number of actions of a relaxed plan extracted from the planning graph,
+    the FF heuristic. It isn't admissible, so it suits the best first search planning.
+    If the goal is not reachable from the state the heuristic returns float('inf')
+    """
+    relaxed_plan = planning_problem.relaxed_planning_graph.relaxed_plan(state)
+    if relaxed_plan is None:
+        return float('inf')  # goal not reachable
+    return len(relaxed_plan[0])
 
 
 def is_fixed(graph, level):
     """
-    Checks if we have reached a fixed point,
+    Checks if we have reached a fixed point, where the propositions and their mutexes stop changing
     """
     if level == 0:
         return False
-    return len(graph[level].get_proposition_layer().get_propositions()) == len(
-        graph[level - 1].get_proposition_layer().get_propositions())
+    layer = graph[level].get_proposition_layer()
+    previous_layer = graph[level - 1].get_proposition_layer()
+    return len(layer.get_propositions()) == len(
+        previous_layer.get_propositions()) and \
+        layer.get_mutex_matrix().sum() == previous_layer.get_mutex_matrix().sum()
 
 
 def null_heuristic(*args, **kwargs):
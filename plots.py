@@ -1,13 +1,17 @@
+import functools
 import time
 
 import numpy as np
 from matplotlib import pyplot as plt
 from planning_problem import max_level, PlanningProblem, level_sum, \
-    null_heuristic
+    null_heuristic, ff_heuristic
 from search import *
 from heuristics import maxPointAirDistHeuristic, \
-    sumAirDistHeuristic, mstAirDistHeuristic
-from search import a_star_search_planning
+    sumAirDistHeuristic, mstAirDistHeuristic, maxPointRoadDistHeuristic, \
+    maxOrderRoadDistHeuristic
+from search import a_star_search_planning, best_first_search_planning
+from heuristic_cache import HeuristicCache, planning_state_key
+from incremental_search import capacity_sweep, prefix_sweep
 
 
 n_groups = 6
@@ -42,7 +46,8 @@ def compare(problems_, probs_, routes):
     planning_nodes_max = []
     planning_results(planning_costs_max, planning_nodes_max,
                      planning_times_max,
-                     probs_, routes, max_level)
+                     probs_, routes,
+                     HeuristicCache(max_level, key=planning_state_key))
 
     ############################### Planning-levelSum ########################
     planning_times_level = []
@@ -50,7 +55,8 @@ def compare(problems_, probs_, routes):
     planning_nodes_level = []
     planning_results(planning_costs_level, planning_nodes_level,
                      planning_times_level,
-                     probs_, routes, level_sum)
+                     probs_, routes,
+                     HeuristicCache(level_sum, key=planning_state_key))
     ############################### Planning-zero ############################
     planning_times_zero = []
     planning_costs_zero = []
@@ -58,6 +64,16 @@ def compare(problems_, probs_, routes):
     planning_results(planning_costs_zero, planning_nodes_zero,
                      planning_times_zero,
                      probs_, routes, null_heuristic)
+    ############################### Planning-FF ############################
+    # greedy, so it scales to all the orders
+    planning_times_ff = []
+    planning_costs_ff = []
+    planning_nodes_ff = []
+    planning_results(planning_costs_ff, planning_nodes_ff, planning_times_ff,
+                     probs_, routes, ff_heuristic,
+                     functools.partial(best_first_search_planning,
+                                       helpful_actions=True),
+                     len(probs_))
     ############################ Comparing A* ###############################
     mst_nodes = []
     sum_nodes = []
@@ -65,28 +81,42 @@ def compare(problems_, probs_, routes):
     sum_costs = []
     mst_times = []
     sum_times = []
+    road_nodes = []
+    road_costs = []
+    road_times = []
+    order_road_nodes = []
+    order_road_costs = []
+    order_road_times = []
     a_star_compare_results(a_star_max_costs, problems_, searcher, mst_costs,
                            sum_costs, mst_nodes, sum_nodes, mst_times,
-                           sum_times)
+                           sum_times, road_costs, road_nodes, road_times,
+                           order_road_costs, order_road_nodes,
+                           order_road_times)
     print("Comparing A* heuristics: Done.")
 
     ############################ Comparing Planning ##########################
     planning_compare(planning_costs_level, planning_costs_max,
                      planning_costs_zero)
     print("Comparing planning heuristics: Done.")
+    ff_planning_compare(planning_costs_ff, planning_nodes_ff,
+                        planning_times_ff)
+    print("FF planning: Done.")
     ################################ Nodes ##################################
     a_star_planning(a_star_max_times, planning_times_max, planning_times_level,
                     planning_times_zero, dfs_times, bfs_times, mst_times,
-                    sum_times, "times")
+                    sum_times, road_times, order_road_times, "times")
     print("Comparing Runtime: Done.")
     a_star_planning(a_star_max_costs, planning_costs_max, planning_costs_level,
                     planning_costs_zero, dfs_costs, bfs_costs, mst_costs,
-                    sum_costs, "costs")
+                    sum_costs, road_costs, order_road_costs, "costs")
     print("Comparing costs: Done.")
     a_star_planning(a_star_max_nodes, planning_nodes_max, planning_nodes_level,
                     planning_nodes_zero, dfs_nodes, bfs_nodes, mst_nodes,
-                    sum_nodes, "expanded nodes")
+                    sum_nodes, road_nodes, order_road_nodes, "expanded nodes")
     print("Comparing expanded nodes: Done.")
+    # last, since the sweep resets the expanded counts of the problems
+    prefix_sweep_compare(a_star_max_times, problems_)
+    print("Comparing the prefix sweep: Done.")
 
 
 def planning_compare(planning_costs_level, planning_costs_max,
@@ -108,6 +138,26 @@ def planning_compare(planning_costs_level, planning_costs_max,
     plt.show()
 
 
+def ff_planning_compare(planning_costs_ff, planning_nodes_ff,
+                        planning_times_ff):
+    ff_index = np.arange(len(planning_costs_ff))
+    plt.figure(figsize=(10, 6))
+    plt.xlabel('Orders number')
+    plt.ylabel("FF planning")
+    plt.title("FF planning search over all the orders numbers")
+    plt.bar(ff_index, planning_costs_ff, 0.3, color='r', label='costs')
+    plt.bar(ff_index + 0.3, planning_nodes_ff, 0.3, color='c',
+            label='expanded nodes')
+    plt.xticks(ff_index + 0.3 / 2, range(1, len(planning_costs_ff) + 1))
+    plt.legend()
+    plt.savefig("ff_planning.png", format='png',
+                bbox_inches='tight')
+    plt.show()
+    for i, elapsed_time in enumerate(planning_times_ff):
+        print("FF planning over", i + 1, "orders took %.2f seconds"
+              % elapsed_time)
+
+
 def dfs_results(dfs_costs, dfs_nodes, dfs_times, problems_):
     for i, problem in enumerate(problems_):
         if i == 6: break
@@ -141,7 +191,7 @@ def bfs_results(bfs_costs, bfs_nodes, bfs_times, problems_):
 
 
 def a_star_planning(a_star, planning_max, planning_level, planning_zero, dfs,
-                    bfs, mst, sum_, graph_name):
+                    bfs, mst, sum_, road, order_road, graph_name):
     plt.figure(figsize=(10, 6))
     plt.bar(index, a_star, bar_width, color='b',
             label='A* MAX')
@@ -162,8 +212,12 @@ def a_star_planning(a_star, planning_max, planning_level, planning_zero, dfs,
             label='BFS')
     plt.bar(index + bar_width * 7, dfs, bar_width, color='orange',
             label='DFS')
+    plt.bar(index + bar_width * 8, road, bar_width, color='y',
+            label='A* ROAD')
+    plt.bar(index + bar_width * 9, order_road, bar_width, color='brown',
+            label='A* ORDER_ROAD')
     # plt.show()
-    plt.xticks(index + bar_width * 7 / 2, range(1, n_groups + 1))
+    plt.xticks(index + bar_width * 9 / 2, range(1, n_groups + 1))
     plt.legend()
     plt.savefig(graph_name + ".png", format='png',
                 bbox_inches='tight')
@@ -172,19 +226,24 @@ def a_star_planning(a_star, planning_max, planning_level, planning_zero, dfs,
 
 def a_star_compare_results(a_star_costs, problems_, searcher, mst_costs,
                            sum_costs, mst_nodes, sum_nodes, mst_times,
-                           sum_times):
+                           sum_times, road_costs, road_nodes, road_times,
+                           order_road_costs, order_road_nodes,
+                           order_road_times):
+    # the order prefixes share one map, so they share the MST values
+    mst_heuristic = HeuristicCache(mstAirDistHeuristic)
     for i, problem in enumerate(problems_):
         if i == 6: break
         print("Run mst over", i + 1)
+        problem.expanded = 0
         start_time = time.time()
-        path, mst_cost = searcher.a_star(problem,
-                                         heuristic=mstAirDistHeuristic)
+        path, mst_cost = searcher.a_star(problem, heuristic=mst_heuristic)
         end_time = time.time()
         elapsed_time = (end_time - start_time)
         mst_times.append(elapsed_time)
         mst_costs.append(mst_cost)
         mst_nodes.append(problem.expanded)
         print("Run sum over", i + 1)
+        problem.expanded = 0
         start_time = time.time()
         path, sum_cost = searcher.a_star(problem,
                                          heuristic=sumAirDistHeuristic)
@@ -193,19 +252,43 @@ def a_star_compare_results(a_star_costs, problems_, searcher, mst_costs,
         sum_times.append(elapsed_time)
         sum_costs.append(sum_cost)
         sum_nodes.append(problem.expanded)
+        print("Run road over", i + 1)
+        problem.expanded = 0
+        start_time = time.time()
+        path, road_cost = searcher.a_star(problem,
+                                          heuristic=maxPointRoadDistHeuristic)
+        end_time = time.time()
+        elapsed_time = (end_time - start_time)
+        road_times.append(elapsed_time)
+        road_costs.append(road_cost)
+        road_nodes.append(problem.expanded)
+        print("Run order_road over", i + 1)
+        problem.expanded = 0
+        start_time = time.time()
+        path, order_road_cost = searcher.a_star(
+            problem, heuristic=maxOrderRoadDistHeuristic)
+        end_time = time.time()
+        elapsed_time = (end_time - start_time)
+        order_road_times.append(elapsed_time)
+        order_road_costs.append(order_road_cost)
+        order_road_nodes.append(problem.expanded)
 
     plt.figure(figsize=(10, 6))
     plt.xlabel('Orders number')
     plt.ylabel("Heuristic costs")
     plt.title("A* Search heuristics costs")
-    plt.bar(index, a_star_costs, 0.2, color='b',
+    plt.bar(index, a_star_costs, 0.15, color='b',
             label='max')
-    plt.bar(index + 0.2, mst_costs, 0.2, color='g',
+    plt.bar(index + 0.15, mst_costs, 0.15, color='g',
             label='mst')
-    plt.bar(index + 0.2 * 2, sum_costs, 0.2, color='silver',
+    plt.bar(index + 0.15 * 2, sum_costs, 0.15, color='silver',
             label='sum')
+    plt.bar(index + 0.15 * 3, road_costs, 0.15, color='y',
+            label='road')
+    plt.bar(index + 0.15 * 4, order_road_costs, 0.15, color='brown',
+            label='order_road')
 
-    plt.xticks(index + 0.2 * 2 / 2, range(1, n_groups + 1))
+    plt.xticks(index + 0.15 * 4 / 2, range(1, n_groups + 1))
     plt.legend()
     plt.savefig("max_vs_mst_vs_sum.png", format='png',
                 bbox_inches='tight')
@@ -213,12 +296,14 @@ def a_star_compare_results(a_star_costs, problems_, searcher, mst_costs,
 
 
 def planning_results(planning_costs, planning_nodes, planning_times,
-                     probs_, routes, func):
+                     probs_, routes, func, search=a_star_search_planning,
+                     max_orders=6):
     for i, prob in enumerate(probs_):
-        if i == 6: break
+        if i == max_orders: break
         print("Run planning over", i + 1, "orders")
+        prob.expanded = 0
         start_time = time.time()
-        plan = a_star_search_planning(prob, func)
+        plan = search(prob, func)
         end_time = time.time()
         elapsed_time = (end_time - start_time)
         planning_times.append(elapsed_time)
@@ -249,31 +334,57 @@ def a_star_results(a_star_costs, a_star_times, problems_, searcher,
         a_star_nodes.append(problem.expanded)
 
 
-def capacity_results(probs_):
+def prefix_sweep_compare(a_star_times, problems_):
     """
-        Compares the performance of A* search and planning.
+        Compares the times of the independent A* runs over the order prefixes with one prefix
+        sweep, where each prefix is seeded by the solution of the previous one.
+    """
+    sweep_times = []
+    start_time = time.time()
+    for i, (path, total_cost, expanded) in enumerate(
+            prefix_sweep(problems_[:6], maxPointAirDistHeuristic)):
+        print("Run a_star prefix sweep over", i + 1, "orders")
+        end_time = time.time()
+        # Calculate elapsed time in seconds and append to the list
+        sweep_times.append(end_time - start_time)
+        start_time = time.time()
+
+    plt.figure(figsize=(10, 6))
+    plt.xlabel('Orders number')
+    plt.ylabel("A* times")
+    plt.title("Independent A* runs against one prefix sweep")
+    plt.bar(index, a_star_times, 0.3, color='b', label='A* MAX')
+    plt.bar(index + 0.3, sweep_times, 0.3, color='c',
+            label='A* MAX prefix sweep')
+    plt.xticks(index + 0.3 / 2, range(1, n_groups + 1))
+    plt.legend()
+    plt.savefig("prefix_sweep.png", format='png',
+                bbox_inches='tight')
+    plt.show()
+
+
+def capacity_results(problems_):
+    """
+        Compares the costs of A* search over the capacities 1 to 7, solved by one capacity sweep
+        per order prefix.
     """
     ############################### A* search ############################
-    searcher = AStarSearch()
     a_star_con_times = []
     a_star_con_costs = []
     a_star_con_nodes = []
-    for i, problem in enumerate(probs_):
+    # the order prefixes share one map, so they share the heuristic values
+    heuristic = HeuristicCache(maxPointAirDistHeuristic)
+    for i, problem in enumerate(problems_):
         if i == 7: break
         print("Run a_star with capacity over", i + 1, "orders")
-        a_star_con_times.append([])
-        a_star_con_costs.append([])
-        a_star_con_nodes.append([])
-        for j in range(7):
-            start_time = time.time()
-            optimal_path, total_cost = searcher.a_star(problem[j],
-                                                       heuristic=maxPointAirDistHeuristic)
-            end_time = time.time()
-            # Calculate elapsed time in seconds and append to the list
-            elapsed_time = (end_time - start_time)
-            a_star_con_times[-1].append(elapsed_time)
-            a_star_con_costs[-1].append(total_cost)
-            a_star_con_nodes[-1].append(problem[j].expanded)
+        start_time = time.time()
+        results = capacity_sweep(problem, range(1, 8), heuristic)
+        end_time = time.time()
+        # Calculate elapsed time in seconds of the whole sweep
+        elapsed_time = (end_time - start_time)
+        a_star_con_times.append(elapsed_time)
+        a_star_con_costs.append([cost for _, cost, _ in results])
+        a_star_con_nodes.append([expanded for _, _, expanded in results])
 
     plt.figure(figsize=(10, 6))
     plt.xlabel('Orders number')
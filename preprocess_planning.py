@@ -1,39 +1,51 @@
-def create_domain_problem_files(name, lines, problem_orders):
+def create_domain_problem(lines, problem_orders):
     """
-        Creates domain and problem files based on provided data.
+        Creates the lines of the domain and problem files based on provided data, in memory.
 
     """
-    domain_file = open("domain" + name, 'w')
-    problem_file = open("problem" + name, 'w')
     map_points = set()
     actions = list()
     pre = list()
     process_domain(actions, lines, map_points)
     dests = []
-    problem_file.write("Initial state: @#")
-    process_problem(actions, dests, pre, problem_file, problem_orders)
-    problem_file.write("\nGoal state:")
+    problem = ["Initial state: @#"]
+    process_problem(actions, dests, pre, problem, problem_orders)
+    problem.append("\nGoal state:")
     for d in dests:
-        problem_file.write(d)
-    domain_file.write("Propositions:\n")
+        problem.append(d)
+    domain = ["Propositions:\n"]
     for point in map_points:
-        domain_file.write("@" + point + " ")
+        domain.append("@" + point + " ")
     for p in pre:
-        domain_file.write(p)
-    domain_file.write("\nActions:")
+        domain.append(p)
+    domain.append("\nActions:")
     for action in actions:
-        domain_file.write(action)
+        domain.append(action)
+    return "".join(domain).splitlines(True), "".join(problem).splitlines(True)
+
+
+def create_domain_problem_files(name, lines, problem_orders):
+    """
+        Creates domain and problem files based on provided data, and returns their lines.
+
+    """
+    domain, problem = create_domain_problem(lines, problem_orders)
+    with open("domain" + name, 'w') as domain_file:
+        domain_file.writelines(domain)
+    with open("problem" + name, 'w') as problem_file:
+        problem_file.writelines(problem)
+    return domain, problem
 
 
-def process_problem(actions, dests, pre, problem_file, problem_orders):
+def process_problem(actions, dests, pre, problem, problem_orders):
     """
     Processes problem orders to generate actions and initial/goal states.
     """
     for line in problem_orders:
         src, dest = line.rstrip('\n').split("-")
-        problem_file.write(" order@" + src + dest)
+        problem.append(" order@" + src + dest)
         actions.append(
-            "\nName: Pickup_Order_" + dest + "\npre: @" + src + " order@"
+            "\nName: Pickup_Order_" + src + dest + "\npre: @" + src + " order@"
             + src + dest + "\nadd: has_Order_" + src + dest + "\ndelete: order@" + src + dest)
         dests.append(" deliver_order_" + src + dest)
         actions.append(
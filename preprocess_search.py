@@ -1,3 +1,6 @@
+import hashlib
+
+from CONSTANTS import SHORTEST_PATHS_CACHE
 from map_routes import MapRoutes
 from order import Order
 
@@ -18,6 +21,8 @@ def get_map_routes(lines):
     Parses a list of lines to create a MapRoutes object with route information.
     """
     c_map_routes = MapRoutes(None)
+    c_map_routes.set_map_hash(
+        hashlib.sha1("".join(lines).encode()).hexdigest())
     for line in lines:
         point, neighbors = line.rstrip('\n').split(":")
         if neighbors:
@@ -30,10 +35,20 @@ def get_map_routes(lines):
 
 def add_air_distances(air_routes, map_points, air_distances_matrix):
     """
-    Adds air distance data to the air_routes object based on provided distance matrix.
+    Adds air distance data to the air_routes object based on provided distance matrix,
+    given as rows of distances in the order of map_points.
     """
-    for p, line in zip(map_points, air_distances_matrix):
-        dists = line.split()
-        for index, point in enumerate(map_points):
-            air_routes.add_air_distance(p, point, float(dists[index]))
+    air_routes.set_air_distances(map_points, air_distances_matrix)
     return air_routes
+
+
+def add_shortest_paths(map_routes):
+    """
+    Adds the all-pairs shortest road distances to the map_routes object, loading them from the
+    cache file of its map when one exists.
+    """
+    cache_file = None
+    if map_routes.map_hash is not None:
+        cache_file = SHORTEST_PATHS_CACHE % map_routes.map_hash
+    map_routes.compute_shortest_paths(cache_file)
+    return map_routes
@@ -1,9 +1,9 @@
-from util import Pair
+from util import MutexMatrix
 
 class PropositionLayer(object):
     """
     A class for an PropositionLayer  in a level of the graph.
-    The layer contains a set of propositions and a set of mutex propositions.
+    The layer contains a set of propositions and a boolean matrix of the mutex propositions.
     """
 
     def __init__(self):
@@ -12,33 +12,45 @@ class PropositionLayer(object):
         """
         self.propositions = set()
         # set of all the propositions in the layer
-        self.mutexPropositions = set()
-        # set of pairs of propositions that are mutex in the layer
+        self.mutexPropositions = MutexMatrix()
+        # the propositions in the order they were added, with their mutex matrix
 
     def add_proposition(self, proposition):
         # adds proposition to the propositions set
-        self.propositions.add(proposition)
+        if self.mutexPropositions.add(proposition):
+            self.propositions.add(proposition)
 
     def remove_propositions(self, proposition):
         # remove proposition from the propositions set
         self.propositions.remove(proposition)
+        self.mutexPropositions.remove(proposition)
 
     def get_propositions(self):
         # returns the propositions set
         return self.propositions
 
+    def get_proposition_list(self):
+        # returns the propositions in the order of the rows of the mutex matrix
+        return self.mutexPropositions.items
+
     def add_mutex_prop(self, p1, p2):
         """
-        returns true if proposition p1 and proposition p2 are mutex at this layer
+        adds the pair(p1,p2) to the mutex propositions
         """
-        # adds the pair(p1,p2) to the mutex propositions set
-        self.mutexPropositions.add(Pair(p1, p2))
+        self.mutexPropositions.set_mutex(p1, p2)
 
     def is_mutex(self, p1, p2):
-        return Pair(p1, p2) in self.mutexPropositions
+        return self.mutexPropositions.is_mutex(p1, p2)
+
+    def get_mutex_matrix(self):
+        # returns the boolean mutex matrix over the proposition list
+        return self.mutexPropositions.get_matrix()
+
+    def set_mutex_matrix(self, matrix):
+        self.mutexPropositions.set_matrix(matrix)
 
-    def get_mutex_props(self):  # returns the mutex propositions set
-        return self.mutexPropositions
+    def get_mutex_props(self):  # returns the set of pairs of mutex propositions
+        return self.mutexPropositions.pairs()
 
     def all_preconds_in_layer(self, action):
         """
@@ -52,16 +64,15 @@ class PropositionLayer(object):
 
         for i in range(len(action_pre)):
             for j in range(i + 1, len(action_pre)):
-                pre1 = action_pre[i]
-                pre2 = action_pre[j]
-                if Pair(pre1, pre2) in self.mutexPropositions:
+                if self.is_mutex(action_pre[i], action_pre[j]):
                     return False
 
         return True
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
-                and self.__dict__ == other.__dict__)
+                and self.propositions == other.propositions
+                and self.get_mutex_props() == other.get_mutex_props())
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -0,0 +1,133 @@
+class RelaxedPlanningGraph:
+    """
+    A delete-relaxed planning graph over the integer proposition ids of a PlanningProblem.
+    Instead of building PlanGraphLevel objects level by level, it keeps for every action a counter
+    of its preconditions not reached yet: when a proposition is first reached, the counters of the
+    actions requiring it are decremented, and an action whose counter hits zero fires, reaching its
+    add effects one level later. The level of a proposition is its h_max value with unit action costs.
+    """
+
+    def __init__(self, planning_problem):
+        """
+        Constructor
+        """
+        prop_ids = planning_problem.prop_ids
+        self.actions = planning_problem.search_actions
+        self.num_props = len(planning_problem.propositions)
+        self.pre_counts = []  # action index -> number of preconditions
+        self.pre_ids = []  # action index -> ids of its preconditions
+        self.add_ids = []  # action index -> ids of its add effects
+        self.actions_by_pre = [[] for _ in range(self.num_props)]
+        # proposition id -> indices of the actions requiring it
+        self.actions_by_add = [[] for _ in range(self.num_props)]
+        # proposition id -> indices of the actions adding it
+        self.unconditional_actions = []  # indices of the actions without preconditions
+        for index, action in enumerate(self.actions):
+            pre_ids = {prop_ids[prop] for prop in action.get_pre()}
+            self.pre_counts.append(len(pre_ids))
+            self.pre_ids.append(sorted(pre_ids))
+            self.add_ids.append([prop_ids[prop] for prop in action.get_add()])
+            for prop_id in pre_ids:
+                self.actions_by_pre[prop_id].append(index)
+            for prop_id in self.add_ids[-1]:
+                self.actions_by_add[prop_id].append(index)
+            if not pre_ids:
+                self.unconditional_actions.append(index)
+        self.goal_ids = sorted({prop_ids[prop] for prop in planning_problem.goal})
+
+    def prop_levels(self, state, stop_at_goal=True):
+        """
+        Returns a list with the level each proposition is first reached at from a bitset state, or
+        None for the propositions never reached. With stop_at_goal, the expansion stops as soon as
+        all the goal propositions are reached.
+        """
+        return self.expand(state, stop_at_goal)[0]
+
+    def expand(self, state, stop_at_goal=True):
+        """
+        Expands the relaxed planning graph from a bitset state. Returns the list of the levels the
+        propositions are first reached at, and the list of the actions that first reach them (None
+        for the propositions of the state and the unreachable ones).
+        """
+        levels = [None] * self.num_props
+        achievers = [None] * self.num_props
+        layer = []
+        while state:
+            low_bit = state & -state
+            prop_id = low_bit.bit_length() - 1
+            levels[prop_id] = 0
+            layer.append(prop_id)
+            state ^= low_bit
+        counters = list(self.pre_counts)
+        fired = list(self.unconditional_actions)
+        goals_left = sum(1 for goal in self.goal_ids if levels[goal] is None)
+        level = 0
+        while layer and (goals_left > 0 or not stop_at_goal):
+            for prop_id in layer:
+                for index in self.actions_by_pre[prop_id]:
+                    counters[index] -= 1
+                    if counters[index] == 0:
+                        fired.append(index)
+            layer = []
+            for index in fired:
+                for prop_id in self.add_ids[index]:
+                    if levels[prop_id] is None:
+                        levels[prop_id] = level + 1
+                        achievers[prop_id] = index
+                        layer.append(prop_id)
+            goals_left -= sum(1 for goal in self.goal_ids
+                              if levels[goal] == level + 1)
+            fired = []
+            level += 1
+        return levels, achievers
+
+    def goal_levels(self, state):
+        """
+        Returns the list of the levels the goal propositions are first reached at from a bitset
+        state, or None if some goal proposition is unreachable.
+        """
+        levels = self.prop_levels(state)
+        goal_levels = [levels[goal] for goal in self.goal_ids]
+        if None in goal_levels:
+            return None
+        return goal_levels
+
+    def relaxed_plan(self, state):
+        """
+        Extracts a relaxed plan from a bitset state, FF style: going down from the last level, every
+        sub-goal not achieved yet by the chosen actions is achieved by the action that first reached
+        it, whose preconditions become sub-goals at their own levels.
+        Returns the list of the relaxed plan actions and the set of the helpful actions, the
+        actions applicable in the state that achieve a sub-goal of the first level, or None if the
+        goal is unreachable.
+        """
+        levels, achievers = self.expand(state)
+        if any(levels[goal] is None for goal in self.goal_ids):
+            return None
+        sub_goals = [[] for _ in range(max(
+            [levels[goal] for goal in self.goal_ids], default=0) + 1)]
+        marked = set()  # the propositions already required as sub-goals
+        for goal in self.goal_ids:
+            sub_goals[levels[goal]].append(goal)
+            marked.add(goal)
+        plan = []
+        for level in range(len(sub_goals) - 1, 0, -1):
+            achieved = set()
+            for prop_id in sub_goals[level]:
+                if prop_id in achieved:
+                    continue
+                index = achievers[prop_id]
+                plan.append(index)
+                achieved.update(self.add_ids[index])
+                for pre_id in self.pre_ids[index]:
+                    if levels[pre_id] > 0 and pre_id not in marked:
+                        marked.add(pre_id)
+                        sub_goals[levels[pre_id]].append(pre_id)
+        helpful = set()
+        if len(sub_goals) > 1:
+            for prop_id in sub_goals[1]:
+                for index in self.actions_by_add[prop_id]:
+                    if all(levels[pre_id] == 0
+                           for pre_id in self.pre_ids[index]):
+                        helpful.add(self.actions[index])
+        return [self.actions[index] for index in plan], helpful
@@ -1,56 +1,142 @@
 import heapq
+import itertools
+import sys
 import util
 
+UPPER_BOUND_TOLERANCE = 1e-9  # slack for the float rounding of g + h against an upper bound
+
+
 class AStarSearch:
     @staticmethod
-    def a_star(problem, heuristic):
-        open_set = []
+    def a_star(problem, heuristic, upper_bound=float('inf'), seed=None,
+               dominance=False, g_costs=None, prune_bound=None):
+        """
+        Runs A* from the start state of the problem and returns the optimal path and its cost.
+        The closed set is hashed, each reached state keeps a pointer to its parent and the action
+        leading to it so the path is rebuilt only once a goal is popped, and heap entries carry an
+        insertion counter so ties never fall back to comparing states.
+        upper_bound is the cost of a known solution: pushes whose f exceeds it are pruned, which
+        keeps the search optimal as long as the heuristic is admissible. seed is a fast
+        constructive solver run first, returning a (path, cost) solution or None, whose cost
+        tightens the upper bound; it is returned when the search finds nothing cheaper. The pruned pushes are counted in problem.pruned.
+        With dominance, a successor is dropped when a state reached at the same location has
+        picked up and delivered supersets of its orders at no higher g, see
+        problem.dominance_key(); the dropped pushes are counted in problem.dominated.
+        g_costs is an optional dict the g cost of every reached state is kept in, so it can be
+        reused after the search. prune_bound is an optional admissible estimate of the cost to the
+        goal, which needn't be consistent: it is only used to prune pushes against the upper
+        bound, never to order the open list.
+        """
+        seed_solution = seed(problem) if seed is not None else None
+        if seed_solution is not None and seed_solution[1] < upper_bound:
+            upper_bound = seed_solution[1]
+        else:
+            seed_solution = None  # only a seed setting the bound is ever returned
+        counter = itertools.count()
         start_state = problem.get_start_state()
-
-        # Convert the start_state to a hashable type (tuple of tuples)
-        start_state_hashed = tuple(
-            tuple(x) if isinstance(x, list) else x for x in start_state)
-        g_costs = {start_state_hashed: 0}
-        heapq.heappush(open_set,
-                       (heuristic(start_state, problem), start_state, []))
-
-        closed_set = []
+        start_state_hashed = hashable_state(start_state)
+        if g_costs is None:
+            g_costs = dict()
+        g_costs[start_state_hashed] = 0
+        parents = {start_state_hashed: None}
+        open_set = [(heuristic(start_state, problem), next(counter),
+                     start_state_hashed, start_state)]
+        frontier = dict()  # location -> {(pickup mask, delivered mask): g} of undominated states
+        if dominance:
+            is_dominated(frontier, problem.dominance_key(start_state), 0)
+
+        closed_set = set()
 
         while open_set:
-            f_cost, current_state, path = heapq.heappop(open_set)
-
-            # Convert the current_state to a hashable type
-            current_state_hashed = tuple(
-                tuple(x) if isinstance(x, list) else x for x in current_state)
+            f_cost, _, current_state_hashed, current_state = heapq.heappop(
+                open_set)
 
             if problem.is_goal_state(current_state):
-                return path, g_costs[current_state_hashed]
+                return (reconstruct_path(parents, current_state_hashed),
+                        g_costs[current_state_hashed])
 
             if current_state_hashed in closed_set:
                 continue
 
-            closed_set.append(current_state_hashed)
+            closed_set.add(current_state_hashed)
+            current_g_cost = g_costs[current_state_hashed]
 
             for successor, action, step_cost in problem.get_successors(
                     current_state):
-                # Convert the successor to a hashable type
-                successor_hashed = tuple(
-                    tuple(x) if isinstance(x, list) else x for x in successor)
-                new_g_cost = g_costs[current_state_hashed] + step_cost
-
+                successor_hashed = hashable_state(successor)
                 if successor_hashed in closed_set:
                     continue
 
+                new_g_cost = current_g_cost + step_cost
                 if new_g_cost < g_costs.get(successor_hashed, float('inf')):
-                    g_costs[successor_hashed] = new_g_cost
+                    if dominance and is_dominated(
+                            frontier, problem.dominance_key(successor),
+                            new_g_cost):
+                        problem.dominated += 1
+                        continue
                     h_cost = heuristic(successor, problem)
-                    total_cost = new_g_cost + h_cost
-                    new_path = path + [action]
-                    heapq.heappush(open_set, (total_cost, successor, new_path))
+                    bound = h_cost
+                    if prune_bound is not None and upper_bound < float('inf'):
+                        bound = max(h_cost, prune_bound(successor))
+                    if new_g_cost + bound - upper_bound > UPPER_BOUND_TOLERANCE:
+                        problem.pruned += 1
+                        continue
+                    g_costs[successor_hashed] = new_g_cost
+                    parents[successor_hashed] = (current_state_hashed, action)
+                    heapq.heappush(open_set,
+                                   (new_g_cost + h_cost, next(counter),
+                                    successor_hashed, successor))
 
+        if seed_solution is not None:
+            return seed_solution  # nothing beats the seed within the tolerance
         return None, float('inf')
 
 
+def is_dominated(frontier, key, g_cost):
+    """
+    Returns whether a state recorded at the same location has picked up and delivered supersets
+    of the orders of the key at a g cost no higher than g_cost. Otherwise the state is recorded
+    and the states it dominates are dropped, so only the undominated states of one location are
+    ever scanned.
+    """
+    if key is None:
+        return False
+    location, pickup, delivered = key
+    states = frontier.setdefault(location, dict())
+    beaten = []
+    for (other_pickup, other_delivered), other_g_cost in states.items():
+        if other_pickup & pickup == pickup and \
+                other_delivered & delivered == delivered:
+            if other_g_cost <= g_cost:
+                return True
+        elif other_g_cost >= g_cost and pickup & other_pickup == other_pickup \
+                and delivered & other_delivered == other_delivered:
+            beaten.append((other_pickup, other_delivered))
+    for other in beaten:
+        del states[other]
+    states[(pickup, delivered)] = g_cost
+    return False
+
+
+def hashable_state(state):
+    """
+    Converts a state to a hashable type (tuple of tuples); bitmask states are returned as they are.
+    """
+    return tuple(tuple(x) if isinstance(x, list) else x for x in state)
+
+
+def reconstruct_path(parents, state_hashed):
+    """
+    Follows the parent pointers back from a state and returns the actions leading to it.
+    """
+    path = []
+    while parents[state_hashed] is not None:
+        state_hashed, action = parents[state_hashed]
+        path.append(action)
+    path.reverse()
+    return path
+
+
 def depth_first_search(problem):
     """
     Performs Depth First Search to explore the deepest nodes in the search tree first.
@@ -147,6 +233,7 @@ def breadth_first_search(problem):
 
 class Node:
     """A node in a search tree."""
+    __slots__ = ('state', 'parent', 'action', 'path_cost', 'depth')
 
     def __init__(self, state, parent=None, action=None, path_cost=0):
         """Create a search tree Node, derived from a parent by an action."""
@@ -190,51 +277,91 @@ class Node:
                 for (next, act, cost) in problem.get_successors(self.state)]
 
 
-REVERSE_PUSH = False
+def nullHeuristic(state, problem=None):
+    """
+    This heuristic is trivial.
+    """
+    return 0
+
+
+def a_star_search_planning(problem, heuristic=nullHeuristic):
+    """Search the node that has the lowest combined cost and heuristic first."""
+    return planning_graph_search(problem, heuristic, lambda g, h: g + h)
 
 
-def graphSearch(problem, fringe):
-    """Search through the successors of a problem to find a goal."""
-    startstate = problem.get_start_state()
-    fringe.push(Node(problem.get_start_state()))
-    try:
-        startstate.__hash__()
-        visited = set()
-    except:
-        visited = list()
+def best_first_search_planning(problem, heuristic=nullHeuristic, weight=None,
+                               helpful_actions=False):
+    """
+    Search the node that has the lowest combined cost and weighted heuristic first, or the lowest
+    heuristic first when weight is None (greedy best first search). The plans found aren't
+    necessarily optimal.
+    With helpful_actions, a node is only expanded by the helpful actions of its state, and if
+    this pruned search fails the search is repeated over all the successors.
+    """
+    if weight is None:
+        priority = lambda g, h: h
+    else:
+        priority = lambda g, h: g + weight * h
+    if helpful_actions:
+        plan = planning_graph_search(problem, heuristic, priority,
+                                     helpful_successors)
+        if plan is not None:
+            return plan
+    return planning_graph_search(problem, heuristic, priority)
+
+
+def helpful_successors(problem, state, successors):
+    """
+    Keeps the successors reached by the helpful actions of the state.
+    """
+    helpful = problem.helpful_actions(state)
+    return [successor for successor in successors if successor[1] in helpful]
 
-    while not fringe.isEmpty():
-        node = fringe.pop()
+
+def planning_graph_search(problem, heuristic, priority, successors_filter=None):
+    """
+    Best first graph search over the hashable states of a planning problem: pops the node of the
+    lowest priority(path cost, heuristic), ties broken by the latest push. A push is dropped when its
+    state was already reached with a path cost at most as high, or its heuristic is infinite.
+    Sets problem.open_peak to the peak number of nodes in the open list, and
+    problem.open_peak_bytes to an estimate of their memory.
+    """
+    counter = itertools.count(0, -1)
+    start = Node(problem.get_start_state())
+    fringe = [(priority(0, heuristic(start.state, problem)), next(counter), start)]
+    best_g = {start.state: 0}  # state -> the lowest path cost it was pushed with
+    closed = set()
+    problem.open_peak = 1
+    problem.open_peak_bytes = open_entry_size(fringe[0])
+    while fringe:
+        _, _, node = heapq.heappop(fringe)
+        if node.state in closed or node.path_cost > best_g[node.state]:
+            continue
         if problem.is_goal_state(node.state):
             return node.path()
-        try:
-            inVisited = node.state in visited
-        except:
-            visited = list(visited)
-            inVisited = node.state in visited
-
-        if not inVisited:
-            if isinstance(visited, list):
-                visited.append(node.state)
-            else:
-                visited.add(node.state)
-            nextNodes = node.expand(problem)
-            if REVERSE_PUSH: nextNodes.reverse()
-            for nextnode in nextNodes:
-                fringe.push(nextnode)
+        closed.add(node.state)
+        successors = problem.get_successors(node.state)
+        if successors_filter is not None:
+            successors = successors_filter(problem, node.state, successors)
+        for next_state, action, cost in successors:
+            g = node.path_cost + cost
+            if next_state in closed or g >= best_g.get(next_state, float('inf')):
+                continue  # dominated
+            h = heuristic(next_state, problem)
+            if h == float('inf'):
+                continue  # dead end
+            best_g[next_state] = g
+            heapq.heappush(fringe, (priority(g, h), next(counter),
+                                    Node(next_state, node, action, cost)))
+        if len(fringe) > problem.open_peak:
+            problem.open_peak = len(fringe)
+            problem.open_peak_bytes = len(fringe) * open_entry_size(fringe[-1])
     return None
 
 
-def nullHeuristic(state, problem=None):
+def open_entry_size(entry):
     """
-    This heuristic is trivial.
+    Returns the size in bytes of an open list entry, with its node.
     """
-    return 0
-
-
-def a_star_search_planning(problem, heuristic=nullHeuristic):
-    """Search the node that has the lowest combined cost and heuristic first."""
-    return graphSearch(problem,
-                       util.PriorityQueueWithFunction(
-                           lambda node: node.path_cost + heuristic(node.state,
-                                                                   problem)))
+    return sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1]) + \
+        sys.getsizeof(entry[2])
@@ -0,0 +1,15 @@
+from graph_plan import GraphPlan
+from planning_problem import PlanningProblem
+from preprocess_planning import create_domain_problem
+
+
+def test_graph_plan_with_two_orders_to_the_same_destination():
+    with open("map.txt") as map_file:
+        lines = list(map_file)
+    domain, problem = create_domain_problem(lines, ["A-1\n", "B-1\n"])
+    steps = GraphPlan(PlanningProblem(domain, problem)).graph_plan()
+    assert steps is not None
+    names = [action.get_name() for step in steps for action in step]
+    for order in ("A1", "B1"):
+        assert "Pickup_Order_" + order in names
+        assert "Deliver_Order_" + order in names
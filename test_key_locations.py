@@ -0,0 +1,23 @@
+from delivery_problem import DeliveryProblem, KeyLocationDeliveryProblem
+from dynamic_programming import PickupDeliveryDP
+from heuristics import maxPointAirDistHeuristic
+from main import create_A_search_problems
+from search import AStarSearch
+
+
+def test_macro_matches_dp_when_an_order_starts_at_the_start(tmp_path):
+    orders_file = tmp_path / "orders.txt"
+    orders_file.write_text("#-3\n7-2\n8-5\n7-I\n")
+    problems, routes = create_A_search_problems(
+        ["map.txt", "air_distances.csv", str(orders_file)])
+    problem = problems[-1]
+    macro = KeyLocationDeliveryProblem(problem.start_state, problem.orders,
+                                       routes)
+    path, cost = AStarSearch.a_star(macro, maxPointAirDistHeuristic)
+    _, dp_cost = PickupDeliveryDP.solve(problem)
+    _, road_cost = AStarSearch.a_star(
+        DeliveryProblem(problem.start_state, problem.orders, routes),
+        maxPointAirDistHeuristic)
+    assert cost == dp_cost == road_cost
+    assert macro.get_cost_of_actions(path) == cost
+    assert problem.get_cost_of_actions(macro.expand_path(path)) == cost
@@ -1,5 +1,7 @@
 import heapq
 
+import numpy as np
+
 
 class Pair(object):
     """
@@ -28,7 +30,83 @@ class Pair(object):
         return "(" + str(self.a) + "," + str(self.b) + ")"
 
     def __hash__(self):
-        return hash(self.a) + hash(self.b)
+        return hash(frozenset((self.a, self.b)))
+
+
+class MutexMatrix(object):
+    """
+    A utility class to represent the mutexes of a layer as a symmetric boolean matrix, indexed by
+    the positions the items were added at.
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.items = []  # the items in the order they were added
+        self.positions = dict()  # item -> its position in items
+        self.matrix = np.zeros((0, 0), dtype=bool)
+
+    def add(self, item):
+        """
+        Adds an item, returns false if it was already added.
+        """
+        if item in self.positions:
+            return False
+        self.positions[item] = len(self.items)
+        self.items.append(item)
+        return True
+
+    def remove(self, item):
+        """
+        Removes an item and its mutexes.
+        """
+        position = self.positions.pop(item)
+        del self.items[position]
+        for other in self.items[position:]:
+            self.positions[other] -= 1
+        if position < len(self.matrix):
+            self.matrix = np.delete(np.delete(self.matrix, position, axis=0),
+                                    position, axis=1)
+
+    def get_matrix(self):
+        """
+        Returns the mutex matrix, grown to the number of items.
+        """
+        missing = len(self.items) - len(self.matrix)
+        if missing > 0:
+            self.matrix = np.pad(self.matrix, ((0, missing), (0, missing)))
+        return self.matrix
+
+    def set_matrix(self, matrix):
+        """
+        Sets the mutex matrix, which must be indexed by the positions of the items.
+        """
+        self.matrix = matrix
+
+    def set_mutex(self, item1, item2):
+        """
+        Marks two added items as mutex.
+        """
+        matrix = self.get_matrix()
+        i, j = self.positions[item1], self.positions[item2]
+        matrix[i, j] = matrix[j, i] = True
+
+    def is_mutex(self, item1, item2):
+        """
+        Returns true if the two items are mutex.
+        """
+        i, j = self.positions.get(item1), self.positions.get(item2)
+        if i is None or j is None or max(i, j) >= len(self.matrix):
+            return False
+        return bool(self.matrix[i, j])
+
+    def pairs(self):
+        """
+        Returns the set of the mutex pairs.
+        """
+        return {Pair(self.items[i], self.items[j])
+                for i, j in np.argwhere(np.triu(self.matrix))}
 
 
 """